@@ -1,10 +1,173 @@
+import hashlib
+import os
+import resource
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from pokedex.defaults import get_default_db_uri
 from pokedex.lookup import PokedexLookup
 from pokedex.db import connect
 
-session = connect()
+from sqlalchemy import create_engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+import memcached
+
+DEFAULT_LANGUAGE_ID = 9  # English
+
+# number of threads that access the database concurrently, which the connection pool is sized for
+DB_THREADS = 1
+
+# default: SQLite defaults, as opened by pokedex
+# readonly: the database file opened read-only and immutable, with pragmas tuned for reads
+# memory: the database file copied into memory at startup, with the same pragmas
+DB_MODES = ('default', 'readonly', 'memory')
+DB_MODE = os.getenv('ROTOM_DB_MODE', 'readonly')
+DB_URI = os.getenv('ROTOM_DB_URI') or get_default_db_uri()
+
+READONLY_PRAGMAS = (
+    'PRAGMA query_only = ON',
+    'PRAGMA temp_store = MEMORY',
+    f'PRAGMA mmap_size = {256 * 1024 * 1024}',
+    # negative values are in KiB rather than pages
+    f'PRAGMA cache_size = {-64 * 1024}',
+)
+
+# connections that keep in-memory copies of the database alive
+_memory_databases = {}
+
+
+def _load_into_memory(path: str) -> str:
+    name = f'rotom-{hashlib.sha1(path.encode()).hexdigest()[:8]}'
+    if name not in _memory_databases:
+        source = sqlite3.connect(f'file:{pathname2url(os.path.abspath(path))}?mode=ro', uri=True)
+        memory = sqlite3.connect(f'file:{name}?mode=memory&cache=shared', uri=True, check_same_thread=False)
+        source.backup(memory)
+        source.close()
+        _memory_databases[name] = memory
+    return f'file:{name}?mode=memory&cache=shared'
+
+
+def engine_options(uri: str, mode: str) -> dict:
+    url = make_url(uri)
+    if mode == 'default' or not url.drivername.startswith('sqlite') or not url.database:
+        return {}
+    if mode == 'memory':
+        target = _load_into_memory(url.database)
+    elif mode == 'readonly':
+        target = f'file:{pathname2url(os.path.abspath(url.database))}?mode=ro&immutable=1'
+    else:
+        raise ValueError(f'unknown database mode: {mode}')
+    return sqlite_engine_options(target)
+
+
+def sqlite_engine_options(target: str) -> dict:
+    """Returns create_engine arguments for pooled read-only connections to an SQLite URI filename."""
+
+    def creator():
+        conn = sqlite3.connect(target, uri=True, check_same_thread=False)
+        for pragma in READONLY_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    return {'creator': creator, 'poolclass': QueuePool, 'pool_size': DB_THREADS, 'max_overflow': DB_THREADS}
+
+
+session = connect(DB_URI, engine_args=engine_options(DB_URI, DB_MODE))
+
+
+def bind(engine):
+    """Rebinds the session, and everything that queries through it, to another engine."""
+    session.remove()
+    session.configure(bind=engine)
 
-_lookup = PokedexLookup(session=session)
+
+def use_database(mode: str):
+    """Rebinds the session to the database opened in another mode."""
+    bind(create_engine(DB_URI, **engine_options(DB_URI, mode)))
+
+
+# the whoosh index is opened on the first lookup rather than on import
+_lookup = None
+_lookup_lock = threading.Lock()
 
 
 def lookup(query):
+    global _lookup
+    if _lookup is None:
+        with _lookup_lock:
+            if _lookup is None:
+                _lookup = PokedexLookup(session=session)
     return _lookup.lookup(query)
+
+
+def _fingerprint(url) -> str:
+    h = hashlib.sha1(str(url).encode())
+    if url.drivername.startswith('sqlite') and url.database:
+        stat = os.stat(url.database)
+        h.update(f'{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    return h.hexdigest()[:12]
+
+
+# identifies the loaded Pokédex data, which only changes between releases
+data_version = _fingerprint(session.bind.url)
+
+# a memcached shared by every replica, as host:port or the path of a Unix socket, behind the in-process caches
+SHARED_CACHE = os.getenv('ROTOM_SHARED_CACHE')
+SHARED_CACHE_TTL = int(os.getenv('ROTOM_SHARED_CACHE_TTL', 7 * 86400))
+shared_cache = memcached.Client(SHARED_CACHE) if SHARED_CACHE else None
+
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # peak rather than current usage, but the best we can do without procfs
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class SessionManager:
+    """Bounds how long ORM objects live in the thread-local session.
+
+    Every unit of work runs in a scope. Objects loaded during a scope are expunged when it ends, and the session
+    itself is closed and replaced every `requests_per_session` scopes, so the identity map never outlives a few
+    requests.
+    """
+
+    def __init__(self, session, requests_per_session: int):
+        self.session = session
+        self.requests_per_session = requests_per_session
+        self.scopes = 0
+        self.recycles = 0
+        self.identity_map_size = 0
+        self._requests = 0
+
+    @contextmanager
+    def scope(self):
+        try:
+            yield self.session
+        finally:
+            self.scopes += 1
+            self._requests += 1
+            self.identity_map_size = len(self.session.identity_map)
+            if self._requests >= self.requests_per_session:
+                self.session.remove()
+                self._requests = 0
+                self.recycles += 1
+            else:
+                self.session.expunge_all()
+
+    def stats(self):
+        return {
+            'scopes': self.scopes,
+            'recycles': self.recycles,
+            'identity_map_size': self.identity_map_size,
+            'rss_bytes': rss_bytes(),
+        }
+
+
+sessions = SessionManager(session, int(os.getenv('ROTOM_SESSION_REQUESTS', 100)))
@@ -0,0 +1,97 @@
+import argparse
+import statistics
+import time
+
+from pokedex.db import tables, util
+
+import app
+import entries
+import learnsets
+import localisation
+import snapshot
+from app import session
+
+# moves learned by most Pokémon, which are the slowest to list from pokemon_moves
+POPULAR_MOVES = ('protect', 'toxic', 'rest', 'substitute')
+
+
+def sample_ids(cls, n):
+    return [id_ for id_, in session.query(cls.model.id).order_by(cls.model.id).limit(n)]
+
+
+def render_times(table, ids, path, warm):
+    timings = []
+    for id_ in ids:
+        if warm:
+            entries.section_for(table, id_, path)
+        else:
+            entries.section_cache.clear()
+            session.expunge_all()
+        start = time.perf_counter()
+        entries.section_for(table, id_, path)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def learners_times(move_id, indexed, repeat):
+    index = learnsets.index()
+    pm = tables.PokemonMove
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if indexed:
+            index.learners_of(move_id)
+        else:
+            session.query(pm.pokemon_move_method_id, pm.pokemon_id).filter(pm.move_id == move_id).distinct().all()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarise(timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return f'{statistics.median(timings) * 1000:8.2f} {p95 * 1000:8.2f} {timings[-1] * 1000:8.2f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Times rendering every registered section.')
+    parser.add_argument('-n', '--sample', type=int, default=50, help='Number of entries of each type to render')
+    parser.add_argument('-t', '--table', action='append', help='Only benchmark these entry types')
+    parser.add_argument('-d', '--db-mode', action='append', choices=app.DB_MODES + ('snapshot',),
+                        help='Database modes to compare (default: the configured mode). "snapshot" is the trimmed '
+                             'in-memory copy the tests use, for stable timings in CI')
+    args = parser.parse_args()
+
+    for db_mode in args.db_mode or [app.DB_MODE]:
+        if db_mode == 'snapshot':
+            snapshot.use()
+        else:
+            app.use_database(db_mode)
+        print(f'database mode: {db_mode}')
+        print(f'{"section":32} {"cache":5} {"median":>8} {"p95":>8} {"max":>8}  (ms)')
+        for table, cls in entries.ENTRY_TYPES.items():
+            if args.table and table not in args.table:
+                continue
+            ids = sample_ids(cls, args.sample)
+            for path in cls.sections:
+                for warm in (False, True):
+                    timings = render_times(table, ids, path, warm)
+                    print(f'{table + "/" + path:32} {"warm" if warm else "cold":5} {summarise(timings)}')
+        print()
+
+        print(f'{"learners of":32} {"via":5} {"median":>8} {"p95":>8} {"max":>8}  (ms)')
+        for identifier in POPULAR_MOVES:
+            move_id = util.get(session, tables.Move, identifier).id
+            for indexed in (False, True):
+                timings = learners_times(move_id, indexed, args.sample)
+                print(f'{identifier:32} {"index" if indexed else "sql":5} {summarise(timings)}')
+        print()
+
+    localisation.load()
+    print(f'{"language":32} {"memory":>8}  (KiB)')
+    for identifier, size in localisation.memory_report().items():
+        print(f'{identifier:32} {size // 1024:8}')
+
+
+if __name__ == '__main__':
+    main()
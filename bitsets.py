@@ -0,0 +1,20 @@
+from typing import Iterable, Iterator
+
+
+def from_positions(positions: Iterable[int]) -> int:
+    bits = 0
+    for p in positions:
+        bits |= 1 << p
+    return bits
+
+
+def iter_positions(bits: int) -> Iterator[int]:
+    """Yields the positions of the set bits, lowest first."""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def count(bits: int) -> int:
+    return bin(bits).count('1')
@@ -0,0 +1,93 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+class TieredCache:
+    """An LRUCache in front of an optional shared cache, e.g. a memcached used by every replica.
+
+    Values found in the shared cache are copied into the local one. Shared keys are derived from `version`, so
+    replicas serving different data never see each other's values.
+    """
+
+    def __init__(self, local: LRUCache, shared, namespace: str, version: str,
+                 encode: Callable[[Any], bytes], decode: Callable[[bytes], Any], ttl: int = 0):
+        self.local = local
+        self.shared = shared
+        self.namespace = namespace
+        self.version = version
+        self.encode = encode
+        self.decode = decode
+        self.ttl = ttl
+        self.shared_hits = 0
+
+    def shared_key(self, key: Hashable) -> str:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return f'rotom:{self.version}:{self.namespace}:{digest}'
+
+    def get(self, key: Hashable, default=None):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        if self.shared is not None:
+            data = self.shared.get(self.shared_key(key))
+            if data is not None:
+                value = self.decode(data)
+                self.local.set(key, value)
+                self.shared_hits += 1
+                return value
+        return default
+
+    def set(self, key: Hashable, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(self.shared_key(key), self.encode(value), self.ttl)
+
+    def clear(self):
+        """Clears the local cache only."""
+        self.local.clear()
+
+    def __contains__(self, key):
+        return key in self.local
+
+    def __len__(self):
+        return len(self.local)
+
+    def stats(self):
+        return {**self.local.stats(), 'shared_hits': self.shared_hits}
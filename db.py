@@ -0,0 +1,48 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+import encounters
+import entries
+import learnsets
+import localisation
+import priority
+import stat_index
+import type_efficacy
+from app import DB_THREADS, DEFAULT_LANGUAGE_ID, sessions
+
+# all database access happens on these threads so that it never blocks the event loop. Each thread has its own
+# thread-local session and every call runs in its own session scope, so nothing loaded by one call is visible to
+# the next; calls only return plain data. Calls run in order of the priority of the update they are made for, and
+# raise priority.Shed if that update expired while they were queued.
+executor = priority.PriorityExecutor(max_workers=DB_THREADS, thread_name_prefix='db')
+
+
+def _in_scope(fn, args):
+    with sessions.scope():
+        return fn(*args)
+
+
+# indexes that are built when the server starts rather than on first use
+INDEXES = (learnsets.index, encounters.index, type_efficacy.chart, stat_index.stat_index, localisation.load)
+
+
+def build_indexes():
+    for build in INDEXES:
+        executor.submit(_in_scope, build, ()).result()
+
+
+async def run(fn, *args):
+    return await asyncio.wrap_future(executor.submit(_in_scope, fn, args, ticket=priority.current_ticket.get()))
+
+
+async def lookup(query: str) -> List[Tuple[str, int]]:
+    return await run(entries.lookup_entries, query)
+
+
+async def section(table: str, id_: int, path: str,
+                  language_id: int = DEFAULT_LANGUAGE_ID) -> Optional[entries.Section]:
+    return await run(entries.section_for, table, id_, path, language_id)
+
+
+async def inline_results(keys: List[Tuple[str, int]], language_id: int = DEFAULT_LANGUAGE_ID) -> List[dict]:
+    return await run(entries.inline_results, keys, language_id)
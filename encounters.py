@@ -0,0 +1,58 @@
+import threading
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Optional, Tuple
+
+from pokedex.db import tables
+
+from app import session
+
+# versions that share the same locations for a Pokémon, and those locations: ((version id, ...), (location id, ...))
+Run = Tuple[Tuple[int, ...], Tuple[int, ...]]
+
+
+class EncounterIndex:
+    """Where every Pokémon can be found in the wild, already grouped into runs of consecutive versions with the
+    same locations, so rendering the locations section is only a matter of looking up names.
+
+    Equal version and location tuples are shared between Pokémon.
+    """
+
+    def __init__(self):
+        # pokemon id -> runs, in version order
+        self.runs: Dict[int, Tuple[Run, ...]] = {}
+
+    @classmethod
+    def build(cls, session) -> 'EncounterIndex':
+        index = cls()
+        e = tables.Encounter
+        rows = session.query(e.pokemon_id, e.version_id, tables.LocationArea.location_id) \
+            .join(tables.LocationArea, tables.LocationArea.id == e.location_area_id) \
+            .distinct() \
+            .order_by(e.pokemon_id, e.version_id, tables.LocationArea.location_id)
+        interned = {}
+        for pokemon_id, pokemon_rows in groupby(rows, key=itemgetter(0)):
+            by_version = ((version_id, tuple(location_id for *_, location_id in version_rows))
+                          for version_id, version_rows in groupby(pokemon_rows, key=itemgetter(1)))
+            runs = []
+            for locations, versions in groupby(by_version, key=itemgetter(1)):
+                versions = tuple(version_id for version_id, _ in versions)
+                runs.append((interned.setdefault(versions, versions), interned.setdefault(locations, locations)))
+            index.runs[pokemon_id] = tuple(runs)
+        return index
+
+    def locations_of(self, pokemon_id: int) -> Tuple[Run, ...]:
+        return self.runs.get(pokemon_id, ())
+
+
+_index: Optional[EncounterIndex] = None
+_lock = threading.Lock()
+
+
+def index() -> EncounterIndex:
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = EncounterIndex.build(session)
+    return _index
@@ -1,19 +1,40 @@
+import json
 from abc import ABCMeta, abstractmethod
 from collections import namedtuple
-from dataclasses import dataclass, field
-from itertools import groupby
-from operator import itemgetter
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type, Union
 
-from pokedex.db import tables, util
+from pokedex.db import tables
 
-from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.orm import selectinload
 
-from app import session
+import encounters
+import learnsets
+import localisation
+import log
+from app import DEFAULT_LANGUAGE_ID, SHARED_CACHE_TTL, data_version, lookup, session, shared_cache
+from cache import LRUCache, TieredCache
 from type_efficacy import get_type_effectiveness
 
 STAT_NAMES = ('HP', 'Attack', 'Defense', 'Sp. Atk', 'Sp. Def', 'Speed')
 
+# Telegram's limit on the length of message text
+MAX_MESSAGE_LENGTH = 4096
+
+# moves like Protect are learned by most Pokémon, so only this many are listed per learn method
+MAX_LEARNERS_SHOWN = 60
+
+
+def truncate_message(text: str) -> str:
+    if len(text) <= MAX_MESSAGE_LENGTH:
+        return text
+    # cut after the last line that fits, so no Markdown entity is left open
+    end = text.rfind('\n', 0, MAX_MESSAGE_LENGTH - 1)
+    if end == -1:
+        return text[:MAX_MESSAGE_LENGTH - 1] + '…'
+    return text[:end] + '\n…'
+
 
 def format_type_effectiveness(type_effectiveness):
     weaknesses = ', '.join(f'{t} ({e:.2g}x)' for t, e in type_effectiveness.items() if e > 1)
@@ -32,23 +53,134 @@ def pokemon_full_image_url(pokemon_id):
 SectionReference = namedtuple('SectionReference', ['name', 'path'])
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Section:
     content: str
     parent: Optional[SectionReference] = None
-    siblings: List[SectionReference] = field(default_factory=list)
-    children: List[SectionReference] = field(default_factory=list)
+    siblings: Tuple[SectionReference, ...] = ()
+    children: Tuple[SectionReference, ...] = ()
+
+
+@lru_cache(maxsize=4096)
+def section_navigation(slug: str, path: str, layout) -> Tuple[Optional[SectionReference], tuple, tuple]:
+    """Returns the parent, siblings and children of a section, shared between every render of that section."""
+    references = tuple(SectionReference(name, f'{slug}/{p}') for name, p in layout)
+    if path == '':
+        return None, (), references
+    siblings = tuple(r for r, (_, p) in zip(references, layout) if p != path)
+    return SectionReference('', f'{slug}/'), siblings, ()
+
+
+@dataclass(frozen=True)
+class SectionSpec:
+    path: str
+    name: str
+    render: Callable[..., Union[str, Section, None]]
+    # relationships of the entry's model used by the render, loaded up front with one query each
+    prefetch: Tuple[str, ...] = ()
+    cacheable: bool = True
+    # whether the section also serves `path/<argument>`, passing the argument to the render
+    argument: bool = False
+
+
+def entry_section(path: str, name: str = '', prefetch: Iterable[str] = (), cacheable: bool = True,
+                  argument: bool = False):
+    """Registers an Entry method as the renderer for the section at `path`.
+
+    The method returns either the section content, in which case its navigation is derived from the other
+    registered sections, a complete Section, or None if the section does not exist.
+    """
+
+    def decorator(render):
+        render.section_spec = SectionSpec(path, name, render, tuple(prefetch), cacheable, argument)
+        return render
+
+    return decorator
+
+
+# entry classes by the table name used in callback data
+ENTRY_TYPES: Dict[str, Type['Entry']] = {}
+
+# bump whenever rendering or the encoding of cached values changes, so replicas running different code never
+# share cached values
+RENDER_VERSION = 1
+# shared cache entries are only valid for this Pokédex data rendered by this code
+CACHE_VERSION = f'{data_version}.{RENDER_VERSION}'
+
+
+def encode_section(section: Section) -> bytes:
+    return json.dumps([section.content, section.parent, section.siblings, section.children]).encode()
+
+
+def decode_section(data: bytes) -> Section:
+    content, parent, siblings, children = json.loads(data)
+    return Section(content,
+                   SectionReference(*parent) if parent else None,
+                   tuple(SectionReference(*r) for r in siblings),
+                   tuple(SectionReference(*r) for r in children))
+
+
+# rendered sections by (slug, path, language id)
+section_cache = TieredCache(LRUCache(maxsize=4096), shared_cache, 'section', CACHE_VERSION,
+                            encode_section, decode_section, SHARED_CACHE_TTL)
+
+# (table, id) of the entries matching a lookup query
+lookup_cache = TieredCache(LRUCache(maxsize=1024), shared_cache, 'lookup', CACHE_VERSION,
+                           lambda keys: json.dumps(keys).encode(),
+                           lambda data: [tuple(key) for key in json.loads(data)], SHARED_CACHE_TTL)
 
 
 class Entry(metaclass=ABCMeta):
     slug: str
+    model_id: int
+    table: str
+    model: type
+    sections: Dict[str, SectionSpec] = {}
+    # (name, path) of each section below the default section, in display order
+    layout: Tuple[Tuple[str, str], ...] = ()
+    # the language names and flavour texts are rendered in
+    language_id: int = DEFAULT_LANGUAGE_ID
+
+    def __init_subclass__(cls, table: str = None, model: type = None, **kwargs):
+        super().__init_subclass__(**kwargs)
+        specs = (getattr(attr, 'section_spec', None) for attr in vars(cls).values())
+        cls.sections = {**cls.sections, **{spec.path: spec for spec in specs if spec}}
+        cls.layout = tuple((spec.name, spec.path) for spec in cls.sections.values() if spec.path)
+        if table:
+            cls.table = table
+            cls.model = model
+            ENTRY_TYPES[table] = cls
+
+    @property
+    def translations(self) -> localisation.Localisation:
+        return localisation.get(self.language_id)
 
-    def section(self, path) -> Optional[Section]:
-        return self.default_section()
+    def section(self, path: str) -> Optional[Section]:
+        spec = self.sections.get(path)
+        argument = None
+        if spec is None:
+            head, _, argument = path.partition('/')
+            spec = self.sections.get(head)
+            if spec is None or not spec.argument or not argument:
+                return None
+        key = (self.slug, path, self.language_id)
+        if spec.cacheable:
+            section = section_cache.get(key)
+            if section is not None:
+                return section
+        rendered = spec.render(self, argument) if argument else spec.render(self)
+        if rendered is None:
+            return None
+        elif isinstance(rendered, Section):
+            section = rendered
+        else:
+            section = Section(rendered, *section_navigation(self.slug, path, self.layout))
+        if spec.cacheable:
+            section_cache.set(key, section)
+        return section
 
-    @abstractmethod
     def default_section(self) -> Section:
-        pass
+        return self.section('')
 
     @abstractmethod
     def title(self):
@@ -62,6 +194,15 @@ class Entry(metaclass=ABCMeta):
     def thumbnail(self):
         pass
 
+    @classmethod
+    def from_id(cls, id_: int, path: str = '') -> Optional['Entry']:
+        query = session.query(cls.model)
+        spec = cls.sections.get(path)
+        if spec:
+            query = query.options(*(selectinload(getattr(cls.model, r)) for r in spec.prefetch))
+        model = query.get(id_)
+        return cls(model) if model is not None else None
+
     @staticmethod
     def from_model(m) -> Optional['Entry']:
         if isinstance(m, tables.PokemonSpecies):
@@ -76,17 +217,81 @@ class Entry(metaclass=ABCMeta):
             return MoveEntry(m)
 
 
-class PokemonEntry(Entry):
+def get_entry(table: str, id_: int, path: str = '', language_id: int = DEFAULT_LANGUAGE_ID) -> Optional[Entry]:
+    cls = ENTRY_TYPES.get(table)
+    if cls is None:
+        return None
+    entry = cls.from_id(id_, path)
+    if entry is not None:
+        entry.language_id = language_id
+    return entry
+
+
+def is_random_query(query: str) -> bool:
+    """Whether pokedex answers `query` with a random entry, e.g. "random", "random:pokemon" or "move:random"."""
+    query = query.strip().lower()
+    return query == 'random' or query.startswith('random:') or query.rpartition(':')[2].strip() == 'random'
+
+
+def lookup_entries(query: str) -> List[Tuple[str, int]]:
+    """Returns the (table, id) of every entry matching `query`, best match first."""
+    # random lookups must not be answered from the cache
+    cacheable = not is_random_query(query)
+    keys = lookup_cache.get(query) if cacheable else None
+    if keys is None:
+        hits = lookup(query)
+        log.debug(hits=hits)
+        keys = [(e.table, e.model_id) for e in (Entry.from_model(h.object) for h in hits) if e]
+        if cacheable:
+            lookup_cache.set(query, keys)
+    return keys
+
+
+def section_for(table: str, id_: int, path: str, language_id: int = DEFAULT_LANGUAGE_ID) -> Optional[Section]:
+    """Returns a section by its callback data, without loading the entry if the section is already cached."""
+    section = section_cache.get((f'{table}/{id_}', path, language_id))
+    if section is not None:
+        return section
+    entry = get_entry(table, id_, path, language_id)
+    return entry.section(path) if entry else None
+
+
+def get_entries(keys: Iterable[Tuple[str, int]], path: str = '',
+                language_id: int = DEFAULT_LANGUAGE_ID) -> List[Entry]:
+    """Loads entries by (table, id), with one query per entry type plus one per relationship used by `path`."""
+    keys = list(keys)
+    ids_by_table = {}
+    for table, id_ in keys:
+        ids_by_table.setdefault(table, []).append(id_)
+    models = {}
+    for table, ids in ids_by_table.items():
+        cls = ENTRY_TYPES[table]
+        query = session.query(cls.model).filter(cls.model.id.in_(ids))
+        spec = cls.sections.get(path)
+        if spec:
+            query = query.options(*(selectinload(getattr(cls.model, r)) for r in spec.prefetch))
+        models.update(((table, m.id), m) for m in query)
+    entries = [ENTRY_TYPES[table](models[table, id_]) for table, id_ in keys if (table, id_) in models]
+    for entry in entries:
+        entry.language_id = language_id
+    return entries
+
+
+class PokemonEntry(Entry, table='pokemon', model=tables.Pokemon):
     def __init__(self, pokemon: tables.Pokemon):
         self.pokemon = pokemon
+        self.model_id = pokemon.id
         self.slug = f'pokemon/{pokemon.id}'
-        self._title = f'{self.pokemon.name} (#{self.pokemon.id:03})'
+
+    @property
+    def _title(self):
+        return f'{self.translations.name("pokemon", self.pokemon.id)} (#{self.pokemon.id:03})'
 
     def title(self):
         return self._title
 
     def description(self):
-        return '/'.join(t.name for t in self.pokemon.types)
+        return '/'.join(self.translations.name('type', t.id) for t in self.pokemon.types)
 
     def thumbnail(self) -> str:
         return self.image_url().replace('full', 'detail')
@@ -101,72 +306,25 @@ class PokemonEntry(Entry):
 
     @staticmethod
     def from_pokemon_id(id_: int) -> Optional['PokemonEntry']:
-        try:
-            pokemon = util.get(session, tables.Pokemon, id=id_)
-            return PokemonEntry(pokemon)
-        except NoResultFound:
-            return None
-
-    def default_section(self) -> Section:
-        return Section(
-            content=self.summary(),
-            children=[
-                SectionReference('Base stats', f'{self.slug}/base_stats'),
-                SectionReference('Evolutions', f'{self.slug}/evolutions'),
-                SectionReference('Locations', f'{self.slug}/locations'),
-                SectionReference('Flavour text', f'{self.slug}/flavour_text'),
-            ]
-        )
-
-    def section(self, path: str) -> Optional[Section]:
-        if path == '':
-            return self.default_section()
-        elif path == 'base_stats':
-            return Section(
-                content=self.base_stats(),
-                parent=SectionReference('', f'{self.slug}/'),
-                siblings=[
-                    SectionReference('Evolutions', f'{self.slug}/evolutions'),
-                    SectionReference('Locations', f'{self.slug}/locations'),
-                    SectionReference('Flavour text', f'{self.slug}/flavour_text'),
-                ],
-            )
-        elif path == 'evolutions':
-            return self.evolutions_section()
-        elif path == 'locations':
-            return Section(
-                self.locations(),
-                parent=SectionReference('', f'{self.slug}/'),
-                siblings=[
-                    SectionReference('Base stats', f'{self.slug}/base_stats'),
-                    SectionReference('Evolutions', f'{self.slug}/evolutions'),
-                    SectionReference('Flavour text', f'{self.slug}/flavour_text'),
-                ],
-            )
-        elif path == 'flavour_text':
-            return Section(
-                self.flavour_text(),
-                parent=SectionReference('', f'{self.slug}/'),
-                siblings=[
-                    SectionReference('Base stats', f'{self.slug}/base_stats'),
-                    SectionReference('Evolutions', f'{self.slug}/evolutions'),
-                    SectionReference('Locations', f'{self.slug}/locations'),
-                ],
-            )
+        return PokemonEntry.from_id(id_)
 
+    @entry_section('', prefetch=('species', 'types', 'abilities', 'hidden_ability', 'default_form'))
     def summary(self):
-        type_effectiveness = get_type_effectiveness(session, self.pokemon)
+        t = self.translations
+        type_effectiveness = get_type_effectiveness(session, self.pokemon, t.names['type'])
+        hidden_ability = self.pokemon.hidden_ability and t.name('ability', self.pokemon.hidden_ability.id)
         s = f'''*{self._title}*
-{self.pokemon.species.genus}
-Type: {'/'.join(t.name for t in self.pokemon.types)}
+{t.name('genus', self.pokemon.species_id)}
+Type: {'/'.join(t.name('type', type_.id) for type_ in self.pokemon.types)}
 {format_type_effectiveness(type_effectiveness)}
-Abilities: {', '.join(a.name for a in self.pokemon.abilities)}
-Hidden ability: {self.pokemon.hidden_ability and self.pokemon.hidden_ability.name}
+Abilities: {', '.join(t.name('ability', a.id) for a in self.pokemon.abilities)}
+Hidden ability: {hidden_ability}
 Height: {self.pokemon.height / 10} m
 Weight: {self.pokemon.weight / 10} kg
 [Image]({self.image_url()})'''
         return s
 
+    @entry_section('base_stats', 'Base stats', prefetch=('stats',))
     def base_stats(self):
         stats = [s.base_stat for s in self.pokemon.stats]
         total = sum(stats)
@@ -182,20 +340,20 @@ Total:   {total}
 ```'''
 
     @staticmethod
-    def _evolution_method(pokemon_evolution: tables.PokemonEvolution) -> str:
+    def _evolution_method(pokemon_evolution: tables.PokemonEvolution, t: localisation.Localisation) -> str:
         if pokemon_evolution.evolution_trigger_id == 1 and pokemon_evolution.minimum_level:
             return f' at level {pokemon_evolution.minimum_level}'
         elif pokemon_evolution.evolution_trigger_id == 3:
-            return f' using a {pokemon_evolution.trigger_item.name}'
+            return f' using a {t.name("item", pokemon_evolution.trigger_item_id)}'
         elif pokemon_evolution.evolution_trigger_id == 2:
             s = ' when traded'
             if pokemon_evolution.held_item:
-                s += f' holding a {pokemon_evolution.held_item.name}'
+                s += f' holding a {t.name("item", pokemon_evolution.held_item_id)}'
             return s
         return ''
 
     @staticmethod
-    def _build_evolutionary_tree(base, evolutions, current_id) -> str:
+    def _build_evolutionary_tree(base, evolutions, current_id, t: localisation.Localisation) -> str:
         tree = []
         stack = [(base, 0)]
         while stack:
@@ -204,13 +362,16 @@ Total:   {total}
                 prefix = ''
             else:
                 prefix = f'`{" " * (depth - 1) * 2}└` '
-            name = f'*{curr.name} (#{curr.id:03})*' if curr.id == current_id else f'{curr.name} (#{curr.id:03})'
-            method = PokemonEntry._evolution_method(curr.evolutions[0]) if curr.evolutions else ''
+            # species share their ids with their default Pokémon
+            name = f'{t.name("pokemon", curr.id)} (#{curr.id:03})'
+            name = f'*{name}*' if curr.id == current_id else name
+            method = PokemonEntry._evolution_method(curr.evolutions[0], t) if curr.evolutions else ''
             tree.append(f'{prefix}{name}{method}')
             for p in sorted(evolutions.get(curr, []), key=lambda x: x.id, reverse=True):
                 stack.append((p, depth + 1))
         return '\n'.join(tree)
 
+    @entry_section('evolutions', 'Evolutions', prefetch=('species',))
     def evolutions_section(self) -> Section:
         chain = self.pokemon.species.evolution_chain.species
         evolutions = {}
@@ -220,54 +381,64 @@ Total:   {total}
                 first = p
             if p.child_species:
                 evolutions[p] = evolutions.get(p, []) + p.child_species
-        content = self._build_evolutionary_tree(first, evolutions, self.pokemon.species_id)
-        section = Section(content, parent=SectionReference('', f'pokemon/{self.pokemon.id}/'))
-        section.children.extend(
-            SectionReference(f'{p.name} (#{p.id:03})', f'pokemon/{p.id}/')
-            for p in chain if p.id != self.pokemon.species_id)
-        return section
+        t = self.translations
+        content = self._build_evolutionary_tree(first, evolutions, self.pokemon.species_id, t)
+        children = tuple(SectionReference(f'{t.name("pokemon", p.id)} (#{p.id:03})', f'pokemon/{p.id}/')
+                         for p in chain if p.id != self.pokemon.species_id)
+        return Section(content, parent=SectionReference('', f'pokemon/{self.pokemon.id}/'), children=children)
 
+    @entry_section('locations', 'Locations')
     def locations(self):
-        q = session.query(tables.Encounter) \
-            .join(tables.LocationArea).join(tables.Location) \
-            .filter(tables.Encounter.pokemon_id == self.pokemon.id) \
-            .group_by(tables.LocationArea.location_id, tables.Encounter.version_id) \
-            .order_by(tables.Encounter.version_id)
-        encounters = ((e.version.names_local.name, e.location_area.location.names_local.name) for e in q)
-        grouped_by_version = ((version_group, tuple(l[1] for l in locations)) for version_group, locations in
-                              groupby(encounters, key=itemgetter(0)))
-        grouped_by_locations = ((tuple(vg[0] for vg in version_group), locations) for locations, version_group in
-                                groupby(grouped_by_version, key=itemgetter(1)))
-        locations = '\n'.join(
-            f'*{", ".join(versions)}:* {", ".join(locations)}' for versions, locations in grouped_by_locations)
-        return f'*{self._title}*\nLocations\n\n' + (locations or 'Not found in the wild')
-
-    def flavour_text(self, language_id=9):
-        q = session.query(tables.PokemonSpeciesFlavorText) \
-            .filter(tables.PokemonSpeciesFlavorText.species_id == self.pokemon.species_id,
-                    tables.PokemonSpeciesFlavorText.language_id == language_id) \
-            .group_by(tables.PokemonSpeciesFlavorText.version_id, tables.PokemonSpeciesFlavorText.flavor_text) \
-            .order_by(tables.PokemonSpeciesFlavorText.flavor_text, tables.PokemonSpeciesFlavorText.version_id)
-        # replace newlines and form feeds with spaces
-        fts = ((t.version_id,
-                t.version.names_local.name,
-                t.flavor_text.replace('\n', ' ').replace('\x0c', ' ')) for t in q)
-        grouped_by_text = [(tuple((ft[0], ft[1]) for ft in flavor_texts), text)
-                           for text, flavor_texts in
-                           groupby(fts, key=itemgetter(2))]
-        sorted_by_version = sorted(grouped_by_text, key=lambda x: min(x[0], key=itemgetter(0)))
-        flavor_texts = '\n'.join(
-            f'*{", ".join(v[1] for v in versions)}:* {flavor_text}' for versions, flavor_text in sorted_by_version)
+        t = self.translations
+        lines = []
+        for versions, locations in encounters.index().locations_of(self.pokemon.id):
+            lines.append(f'*{", ".join(t.name("version", v) for v in versions)}:* '
+                         f'{", ".join(t.name("location", l) for l in locations)}')
+        return f'*{self._title}*\nLocations\n\n' + ('\n'.join(lines) or 'Not found in the wild')
+
+    @entry_section('flavour_text', 'Flavour text')
+    def flavour_text(self):
+        t = self.translations
+        flavor_texts = '\n'.join(f'*{", ".join(t.name("version", v) for v in versions)}:* {flavor_text}'
+                                 for versions, flavor_text in t.flavour_text(self.pokemon.species_id))
         return f'*{self._title}*\nFlavour text\n\n' + flavor_texts
 
+    @entry_section('learnset', 'Learnset', argument=True)
+    def learnset(self, version_group: str = None) -> Optional[Section]:
+        index = learnsets.index()
+        version_groups = index.version_groups_for(self.pokemon.id)
+        parent = SectionReference('', f'{self.slug}/')
+        if not version_groups:
+            return Section(f'*{self._title}*\nLearnset\n\nNo moves found', parent=parent)
+        if version_group is None:
+            version_group_id = version_groups[-1]
+        elif version_group.isdigit() and int(version_group) in version_groups:
+            version_group_id = int(version_group)
+        else:
+            return None
+        t = self.translations
+        lines = []
+        for method_id, moves in index.learnset(self.pokemon.id, version_group_id):
+            names = [(t.name('move', move_id), level) for move_id, level in moves]
+            if method_id == learnsets.LEVEL_UP:
+                names = ', '.join(f'L{level} {name}' for name, level in sorted(names, key=lambda m: (m[1], m[0])))
+            else:
+                names = ', '.join(sorted(name for name, _ in names))
+            lines.append(f'*{index.method_names[method_id]}:* {names}')
+        content = f'*{self._title}*\nLearnset ({index.version_groups[version_group_id][1]})\n\n' + '\n'.join(lines)
+        children = tuple(SectionReference(index.version_groups[vg][1], f'{self.slug}/learnset/{vg}')
+                         for vg in version_groups if vg != version_group_id)
+        return Section(truncate_message(content), parent=parent, children=children)
+
 
-class ItemEntry(Entry):
+class ItemEntry(Entry, table='item', model=tables.Item):
     def __init__(self, item: tables.Item):
         self.item = item
+        self.model_id = item.id
         self.slug = f'item/{self.item.id}'
 
     def title(self):
-        return f'{self.item.name} (item)'
+        return f'{self.translations.name("item", self.item.id)} (item)'
 
     def description(self):
         return f'{self.item.short_effect}'
@@ -275,21 +446,20 @@ class ItemEntry(Entry):
     def thumbnail(self):
         pass
 
-    def default_section(self) -> Section:
-        return Section(self.summary())
-
+    @entry_section('', cacheable=False)
     def summary(self):
-        return f'''*{self.item.name}* (item)
+        return f'''*{self.translations.name("item", self.item.id)}* (item)
 {self.item.effect}'''
 
 
-class AbilityEntry(Entry):
+class AbilityEntry(Entry, table='ability', model=tables.Ability):
     def __init__(self, ability) -> None:
         self.ability = ability
+        self.model_id = ability.id
         self.slug = f'ability/{self.ability.id}'
 
     def title(self):
-        return f'{self.ability.name} (ability)'
+        return f'{self.translations.name("ability", self.ability.id)} (ability)'
 
     def description(self):
         return f'{self.ability.short_effect}'
@@ -297,21 +467,20 @@ class AbilityEntry(Entry):
     def thumbnail(self):
         pass
 
-    def default_section(self) -> Section:
-        return Section(self.summary())
-
+    @entry_section('', cacheable=False)
     def summary(self):
-        return f'''*{self.ability.name}* (ability)
+        return f'''*{self.translations.name("ability", self.ability.id)}* (ability)
 {self.ability.effect}'''
 
 
-class MoveEntry(Entry):
+class MoveEntry(Entry, table='move', model=tables.Move):
     def __init__(self, move):
         self.move = move
+        self.model_id = move.id
         self.slug = f'move/{self.move.id}'
 
     def title(self):
-        return f'{self.move.name} (move)'
+        return f'{self.translations.name("move", self.move.id)} (move)'
 
     def description(self):
         return f'{self.move.short_effect}'
@@ -319,26 +488,43 @@ class MoveEntry(Entry):
     def thumbnail(self):
         pass
 
-    def default_section(self) -> Section:
-        return Section(self.summary())
-
+    @entry_section('', cacheable=False)
     def summary(self):
-        return f'''*{self.move.name}* (move)
-Type: {self.move.type.name}
+        t = self.translations
+        return f'''*{t.name("move", self.move.id)}* (move)
+Type: {t.name("type", self.move.type_id)}
 Power: {self.move.power}
 Accuracy: {self.move.accuracy}
 PP: {self.move.pp}
 {self.move.effect}'''
 
+    @entry_section('learners', 'Learned by')
+    def learners(self):
+        index = learnsets.index()
+        lines = []
+        t = self.translations
+        for method_id, pokemon_ids in index.learners_of(self.move.id):
+            shown = ', '.join(t.name('pokemon', id_) for id_ in pokemon_ids[:MAX_LEARNERS_SHOWN])
+            more = f' and {len(pokemon_ids) - MAX_LEARNERS_SHOWN} more' if len(pokemon_ids) > MAX_LEARNERS_SHOWN else ''
+            lines.append(f'*{index.method_names[method_id]} ({len(pokemon_ids)}):* {shown}{more}')
+        learners = '\n'.join(lines) or 'Not learned by any Pokémon'
+        return truncate_message(f'*{t.name("move", self.move.id)}* (move)\nLearned by\n\n' + learners)
+
 
 def reply_markup_for_section(section) -> Optional[Dict]:
+    # the returned markup is shared between every section with the same navigation and must not be modified
+    return _reply_markup(section.parent, tuple(section.siblings), tuple(section.children))
+
+
+@lru_cache(maxsize=4096)
+def _reply_markup(parent, siblings, children) -> Optional[Dict]:
     buttons = []
-    if section.parent:
-        buttons.append({'text': 'Back', 'callback_data': section.parent[1]})
-    if not section.children:
-        for name, path in section.siblings:
+    if parent:
+        buttons.append({'text': 'Back', 'callback_data': parent[1]})
+    if not children:
+        for name, path in siblings:
             buttons.append({'text': name, 'callback_data': path})
-    for name, path in section.children:
+    for name, path in children:
         buttons.append({'text': name, 'callback_data': path})
     if buttons:
         return {'inline_keyboard': [[b] for b in buttons]}
@@ -360,3 +546,7 @@ def inline_result_for_entry(entry: Entry):
     if thumbnail:
         result['thumb_url'] = thumbnail
     return result
+
+
+def inline_results(keys: Iterable[Tuple[str, int]], language_id: int = DEFAULT_LANGUAGE_ID) -> List[Dict]:
+    return [inline_result_for_entry(e) for e in get_entries(keys, language_id=language_id)]
@@ -0,0 +1,112 @@
+import threading
+from array import array
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from pokedex.db import tables
+
+import bitsets
+from app import session
+
+LEVEL_UP = 1
+
+# a learnset is a sequence of (method id, [(move id, level), ...]), ordered by method
+Learnset = List[Tuple[int, List[Tuple[int, int]]]]
+
+
+class LearnsetIndex:
+    """The moves every Pokémon learns in every version group, so rendering a learnset never scans pokemon_moves.
+
+    The move ids learnt by each (Pokémon, version group, method) are sorted and delta-encoded into one shared
+    array, with their levels in a parallel array. The inverse, every Pokémon that learns a move by a method in any
+    version group, is kept as an int bitmap over `pokemon_ids`.
+    """
+
+    def __init__(self):
+        self.moves = array('H')
+        self.levels = array('B')
+        # (pokemon id, version group id) -> ((method id, start, end), ...) ranges of `moves`
+        self.runs: Dict[Tuple[int, int], Tuple[Tuple[int, int, int], ...]] = {}
+        # every Pokémon with a learnset, in id order; bit i of a learners bitmap is pokemon_ids[i]
+        self.pokemon_ids = array('H')
+        # (move id, method id) -> bitmap of the Pokémon that learn it
+        self.learners: Dict[Tuple[int, int], int] = {}
+        self.method_names: Dict[int, str] = {}
+        # version group id -> (order, name)
+        self.version_groups: Dict[int, Tuple[int, str]] = {}
+
+    @classmethod
+    def build(cls, session) -> 'LearnsetIndex':
+        index = cls()
+        pm = tables.PokemonMove
+        rows = session.query(pm.pokemon_id, pm.version_group_id, pm.pokemon_move_method_id, pm.move_id, pm.level) \
+            .distinct() \
+            .order_by(pm.pokemon_id, pm.version_group_id, pm.pokemon_move_method_id, pm.move_id, pm.level)
+        learners = {}
+        for pokemon_id, pokemon_learnsets in groupby(rows, key=itemgetter(0)):
+            position = len(index.pokemon_ids)
+            index.pokemon_ids.append(pokemon_id)
+            for version_group_id, learnset in groupby(pokemon_learnsets, key=itemgetter(1)):
+                runs = []
+                for method_id, moves in groupby(learnset, key=itemgetter(2)):
+                    start = len(index.moves)
+                    previous = 0
+                    for *_, move_id, level in moves:
+                        index.moves.append(move_id - previous)
+                        index.levels.append(level or 0)
+                        previous = move_id
+                        learners.setdefault((move_id, method_id), set()).add(position)
+                    runs.append((method_id, start, len(index.moves)))
+                index.runs[pokemon_id, version_group_id] = tuple(runs)
+        index.learners = {key: bitsets.from_positions(positions) for key, positions in learners.items()}
+
+        index.method_names = {m.id: m.name for m in session.query(tables.PokemonMoveMethod)}
+        index.version_groups = {vg.id: (vg.order, ', '.join(v.name for v in vg.versions))
+                                for vg in session.query(tables.VersionGroup)}
+        return index
+
+    def learnset(self, pokemon_id: int, version_group_id: int) -> Optional[Learnset]:
+        runs = self.runs.get((pokemon_id, version_group_id))
+        if runs is None:
+            return None
+        learnset = []
+        for method_id, start, end in runs:
+            moves = []
+            move_id = 0
+            for i in range(start, end):
+                move_id += self.moves[i]
+                moves.append((move_id, self.levels[i]))
+            learnset.append((method_id, moves))
+        return learnset
+
+    def learners_of(self, move_id: int) -> List[Tuple[int, List[int]]]:
+        """Returns the ids of the Pokémon that learn a move by each method, ordered by method."""
+        learners = []
+        for method_id in sorted(self.method_names):
+            bits = self.learners.get((move_id, method_id))
+            if bits:
+                learners.append((method_id, [self.pokemon_ids[p] for p in bitsets.iter_positions(bits)]))
+        return learners
+
+    def version_groups_for(self, pokemon_id: int) -> List[int]:
+        """Returns the version groups with a learnset for a Pokémon, oldest first."""
+        ids = (vg for vg in self.version_groups if (pokemon_id, vg) in self.runs)
+        return sorted(ids, key=lambda vg: self.version_groups[vg][0])
+
+    def memory_usage(self) -> int:
+        arrays = sum(a.itemsize * len(a) for a in (self.moves, self.levels, self.pokemon_ids))
+        return arrays + sum((bits.bit_length() + 7) // 8 for bits in self.learners.values())
+
+
+_index: Optional[LearnsetIndex] = None
+_lock = threading.Lock()
+
+
+def index() -> LearnsetIndex:
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = LearnsetIndex.build(session)
+    return _index
@@ -0,0 +1,163 @@
+import os
+import sys
+import threading
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Optional, Tuple
+
+from pokedex.db import tables
+
+import names
+from app import DEFAULT_LANGUAGE_ID, session
+from textstore import TextStore
+
+# identifiers of the Pokédex languages to serve, e.g. "en,fr,de,ja". Each one costs a few MiB of names and flavour
+# text; see memory_report()
+LANGUAGES = tuple(filter(None, os.getenv('ROTOM_LANGUAGES', 'en').lower().split(',')))
+
+# whether flavour texts are kept zlib-compressed, trading a decompression on a section cache miss for memory
+COMPRESS_FLAVOUR_TEXT = os.getenv('ROTOM_COMPRESS_FLAVOUR_TEXT', '1') == '1'
+
+# translated names loaded for each language, by kind: (model, translated column)
+NAME_KINDS = {
+    'genus': (tables.PokemonSpecies, 'genus'),
+    'type': (tables.Type, 'name'),
+    'ability': (tables.Ability, 'name'),
+    'move': (tables.Move, 'name'),
+    'item': (tables.Item, 'name'),
+    'version': (tables.Version, 'name'),
+    'location': (tables.Location, 'name'),
+}
+
+# a species' flavour texts as ((version id, ...), text) in order of the first version with each text
+FlavourTexts = Tuple[Tuple[Tuple[int, ...], str], ...]
+
+
+def normalise_flavour_text(text: str) -> str:
+    # replace newlines and form feeds with spaces
+    return text.replace('\n', ' ').replace('\x0c', ' ')
+
+
+class Localisation:
+    """Every name and flavour text rendered in one language, so rendering in that language needs no queries.
+
+    Anything missing in this language is taken from `fallback`.
+    """
+
+    def __init__(self, language_id: int, identifier: str, fallback: Optional['Localisation'] = None):
+        self.language_id = language_id
+        self.identifier = identifier
+        self.fallback = fallback
+        # kind -> id -> name, where Pokémon names are keyed by Pokémon id
+        self.names: Dict[str, Dict[int, str]] = {}
+        # species id -> ((version id, ...), text id) in order of the first version with each text
+        self.flavour_texts: Dict[int, Tuple[Tuple[Tuple[int, ...], int], ...]] = {}
+        # every distinct normalised flavour text, stored once
+        self.texts = TextStore(())
+
+    @classmethod
+    def build(cls, session, language_id: int, identifier: str, fallback: Optional['Localisation'] = None):
+        localisation = cls(language_id, identifier, fallback)
+        localisation.names['pokemon'] = names.pokemon_names(session, language_id)
+        for kind, (model, column) in NAME_KINDS.items():
+            localisation.names[kind] = names.translations(session, model, language_id, column)
+
+        ft = tables.PokemonSpeciesFlavorText
+        rows = session.query(ft.species_id, ft.version_id, ft.flavor_text) \
+            .filter(ft.language_id == language_id) \
+            .distinct() \
+            .order_by(ft.species_id, ft.version_id)
+        text_ids = {}
+        # many species have the same versions with each text, so equal version tuples are shared
+        version_tuples = {}
+        for species_id, species_rows in groupby(rows, key=itemgetter(0)):
+            versions_by_text = {}
+            for _, version_id, text in species_rows:
+                text_id = text_ids.setdefault(normalise_flavour_text(text), len(text_ids))
+                versions_by_text.setdefault(text_id, []).append(version_id)
+            localisation.flavour_texts[species_id] = tuple(
+                (version_tuples.setdefault(tuple(versions), tuple(versions)), text_id)
+                for text_id, versions in versions_by_text.items())
+        localisation.texts = TextStore(list(text_ids), compress=COMPRESS_FLAVOUR_TEXT)
+        return localisation
+
+    def name(self, kind: str, id_: int) -> str:
+        name = self.names[kind].get(id_)
+        if name is None:
+            return self.fallback.name(kind, id_) if self.fallback else ''
+        return name
+
+    def flavour_text(self, species_id: int) -> FlavourTexts:
+        texts = self.flavour_texts.get(species_id)
+        if texts is None:
+            return self.fallback.flavour_text(species_id) if self.fallback else ()
+        return tuple((versions, self.texts[text_id]) for versions, text_id in texts)
+
+    def memory_usage(self) -> int:
+        """Approximates the bytes held by this language's names and flavour texts."""
+        size = sys.getsizeof(self.names) + sys.getsizeof(self.flavour_texts)
+        for names_by_id in self.names.values():
+            size += sys.getsizeof(names_by_id) + sum(sys.getsizeof(n) for n in names_by_id.values())
+        version_tuples = {}
+        for texts in self.flavour_texts.values():
+            size += sys.getsizeof(texts) + sum(sys.getsizeof(t) for t in texts)
+            version_tuples.update((id(versions), versions) for versions, _ in texts)
+        size += sum(sys.getsizeof(versions) for versions in version_tuples.values())
+        return size + self.texts.memory_usage()
+
+
+# language id -> localisation, for every language in LANGUAGES
+_localisations: Dict[int, Localisation] = {}
+# lowercase Pokédex language identifier -> language id
+_language_ids: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def load():
+    if _localisations:
+        return
+    with _lock:
+        if _localisations:
+            return
+        languages = dict(session.query(tables.Language.id, tables.Language.identifier))
+        default = Localisation.build(session, DEFAULT_LANGUAGE_ID, languages[DEFAULT_LANGUAGE_ID].lower())
+        localisations = {DEFAULT_LANGUAGE_ID: default}
+        for language_id, identifier in languages.items():
+            if identifier.lower() in LANGUAGES and language_id != DEFAULT_LANGUAGE_ID:
+                localisations[language_id] = Localisation.build(session, language_id, identifier.lower(), default)
+        _language_ids.update((l.identifier, l.language_id) for l in localisations.values())
+        _localisations.update(localisations)
+
+
+def loaded() -> bool:
+    return bool(_localisations)
+
+
+def _require_loaded():
+    # called from the event loop, which must never query the database itself
+    if not _localisations:
+        raise RuntimeError('localisation.load() has not run')
+
+
+def get(language_id: int) -> Localisation:
+    load()
+    return _localisations.get(language_id) or _localisations[DEFAULT_LANGUAGE_ID]
+
+
+def language_id(language_code: Optional[str]) -> int:
+    """Returns the id of the served language for a Telegram user's IETF language tag, e.g. "pt-br" or "de"."""
+    if not language_code:
+        return DEFAULT_LANGUAGE_ID
+    _require_loaded()
+    language_code = language_code.lower()
+    return _language_ids.get(language_code) or _language_ids.get(language_code.split('-')[0], DEFAULT_LANGUAGE_ID)
+
+
+def is_multilingual() -> bool:
+    _require_loaded()
+    return len(_localisations) > 1
+
+
+def memory_report() -> Dict[str, int]:
+    """Returns the approximate bytes held by each served language, once loaded."""
+    return {l.identifier: l.memory_usage() for l in _localisations.values()}
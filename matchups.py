@@ -0,0 +1,95 @@
+import re
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+
+import entries
+from type_efficacy import chart
+
+MATCHUP = re.compile(r'^(.+?)\s+(?:vs\.?|versus)\s+(.+)$')
+COVERAGE = re.compile(r'^coverage:?\s+(.+)$')
+
+# type combinations that resist every attacking type are listed up to this many
+MAX_WALLS_SHOWN = 10
+
+
+@dataclass(frozen=True)
+class MatchupQuery:
+    first: str
+    second: str
+
+
+@dataclass(frozen=True)
+class CoverageQuery:
+    types: Tuple[str, ...]
+
+
+def parse(query: str) -> Optional[Union[MatchupQuery, CoverageQuery]]:
+    """Parses "<pokemon> vs <pokemon>" and "coverage: <type>, <type>, ..." queries."""
+    m = COVERAGE.match(query)
+    if m:
+        types = tuple(t for t in re.split(r'[\s,/]+', m.group(1)) if t)
+        return CoverageQuery(types) if types else None
+    m = MATCHUP.match(query)
+    if m:
+        return MatchupQuery(m.group(1).strip(), m.group(2).strip())
+    return None
+
+
+def answer(query: Union[MatchupQuery, CoverageQuery]) -> str:
+    if isinstance(query, CoverageQuery):
+        return coverage(query.types)
+    return matchup(query.first, query.second)
+
+
+def _find_pokemon(name: str) -> Optional[entries.PokemonEntry]:
+    keys = [key for key in entries.lookup_entries(name) if key[0] == 'pokemon']
+    return entries.get_entry(*keys[0]) if keys else None
+
+
+def matchup(first: str, second: str) -> str:
+    pokemon = []
+    for name in (first, second):
+        entry = _find_pokemon(name)
+        if entry is None:
+            return f'No Pokémon found for "{name}"!'
+        pokemon.append(entry)
+    c = chart()
+    lines = [f'*{pokemon[0].title()} vs {pokemon[1].title()}*']
+    for attacker, defender in (pokemon, reversed(pokemon)):
+        attacking = c.pokemon_combos[attacker.model_id]
+        defending = c.pokemon_combos[defender.model_id]
+        hits = ', '.join(f'{c.type_names[t]} {c.multipliers[t][defending]:.2g}x' for t in c.combos[attacking])
+        lines.append(f'{attacker.pokemon.name} ({c.combo_name(attacking)}) → {defender.pokemon.name}: {hits}')
+    return '\n'.join(lines)
+
+
+def coverage(type_names: Tuple[str, ...]) -> str:
+    c = chart()
+    types = [c.type_positions.get(name.lower()) for name in type_names]
+    unknown = [name for name, t in zip(type_names, types) if t is None]
+    if unknown:
+        return f'Unknown type: {", ".join(unknown)}'
+    best = c.best_multipliers(types)
+    super_effective = neutral = resisted = immune = 0
+    for multiplier, count in zip(best, c.combo_counts):
+        if multiplier > 1:
+            super_effective += count
+        elif multiplier == 1:
+            neutral += count
+        elif multiplier > 0:
+            resisted += count
+        else:
+            immune += count
+    total = sum(c.combo_counts)
+    lines = [
+        f'*Coverage: {", ".join(c.type_names[t] for t in types)}*',
+        f'Super effective: {super_effective}/{total} Pokémon',
+        f'Neutral: {neutral}/{total}',
+        f'Resisted: {resisted}/{total}',
+        f'Immune: {immune}/{total}',
+    ]
+    walls = sorted((i for i, m in enumerate(best) if m < 1), key=lambda i: (best[i], -c.combo_counts[i]))
+    if walls:
+        lines.append('\nWalled by: ' + ', '.join(
+            f'{c.combo_name(i)} ({best[i]:.2g}x)' for i in walls[:MAX_WALLS_SHOWN]))
+    return '\n'.join(lines)
@@ -0,0 +1,106 @@
+import socket
+import threading
+import time
+from typing import Optional
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class Client:
+    """A minimal client for the memcached text protocol, over TCP ("host:port") or a Unix socket (a path).
+
+    The cache is an optimisation, so the client never raises: on any error it returns None or False and stops
+    contacting the server for `retry_after` seconds. Each thread has its own connection.
+    """
+
+    def __init__(self, address: str, timeout: float = 0.05, retry_after: float = 5.0):
+        self.address = address
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._down_until = 0.0
+        self._local = threading.local()
+
+    def _connect(self):
+        if '/' in self.address:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            target = self.address
+        else:
+            host, _, port = self.address.rpartition(':')
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            target = (host or 'localhost', int(port))
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(target)
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile('rb')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _disconnect(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            sock, reader = connection
+            reader.close()
+            sock.close()
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _call(self, request, default):
+        if not self.available:
+            return default
+        try:
+            return request(*self._connection())
+        except (OSError, ValueError, ProtocolError):
+            self._disconnect()
+            self.errors += 1
+            self._down_until = time.monotonic() + self.retry_after
+            return default
+
+    def get(self, key: str) -> Optional[bytes]:
+        def request(sock, reader):
+            sock.sendall(f'get {key}\r\n'.encode())
+            header = reader.readline()
+            if header == b'END\r\n':
+                return None
+            parts = header.split()
+            if len(parts) != 4 or parts[0] != b'VALUE':
+                raise ProtocolError(header)
+            value = reader.read(int(parts[3]) + 2)[:-2]
+            if reader.readline() != b'END\r\n':
+                raise ProtocolError('missing END')
+            return value
+
+        value = self._call(request, None)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int = 0) -> bool:
+        def request(sock, reader):
+            sock.sendall(f'set {key} 0 {ttl} {len(value)}\r\n'.encode() + value + b'\r\n')
+            reply = reader.readline()
+            if reply not in (b'STORED\r\n', b'NOT_STORED\r\n'):
+                raise ProtocolError(reply)
+            return reply == b'STORED\r\n'
+
+        return self._call(request, False)
+
+    def stats(self):
+        return {'address': self.address, 'available': self.available, 'hits': self.hits, 'misses': self.misses,
+                'errors': self.errors}
@@ -0,0 +1,27 @@
+from typing import Dict
+
+from pokedex.db import tables
+
+
+def pokemon_names(session, language_id: int) -> Dict[int, str]:
+    """Returns the name of every Pokémon by id, using the form's Pokémon name (e.g. Alolan Raichu) if it has one."""
+    species_names = tables.PokemonSpecies.names_table
+    form_names = tables.PokemonForm.names_table
+    by_species = dict(session.query(species_names.pokemon_species_id, species_names.name)
+                      .filter(species_names.local_language_id == language_id))
+    by_form = dict(session.query(tables.PokemonForm.pokemon_id, form_names.pokemon_name)
+                   .join(form_names, form_names.pokemon_form_id == tables.PokemonForm.id)
+                   .filter(tables.PokemonForm.is_default,
+                           form_names.local_language_id == language_id,
+                           form_names.pokemon_name.isnot(None)))
+    return {id_: by_form.get(id_) or by_species.get(species_id, '')
+            for id_, species_id in session.query(tables.Pokemon.id, tables.Pokemon.species_id)
+            if by_form.get(id_) or species_id in by_species}
+
+
+def translations(session, model, language_id: int, column: str = 'name') -> Dict[int, str]:
+    """Returns a translated column of every row of `model` by id, omitting rows without a translation."""
+    names = model.names_table
+    foreign_id = getattr(names, f'{model.__singlename__}_id')
+    value = getattr(names, column)
+    return dict(session.query(foreign_id, value).filter(names.local_language_id == language_id, value.isnot(None)))
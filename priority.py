@@ -0,0 +1,148 @@
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Union
+
+# lower runs first
+INTERACTIVE = 0
+TEXT = 1
+INLINE = 2
+
+
+class Shed(Exception):
+    """Raised instead of running work for an update that is no longer worth answering."""
+
+
+@dataclass(eq=False)
+class Ticket:
+    """The priority and deadline of the work done for one update."""
+    priority: int
+    deadline: float = float('inf')
+    # set when a newer update makes this one pointless, e.g. the user typed another character of an inline query
+    superseded: bool = False
+    created: float = field(default_factory=time.monotonic)
+
+    def expired(self) -> bool:
+        return self.superseded or time.monotonic() > self.deadline
+
+
+class TicketGroup:
+    """The tickets of every update waiting for one piece of shared work. The work is as urgent as the most urgent
+    of them and is only shed once all of them have expired.
+
+    Updates without a ticket are never shed, and neither is work they wait for.
+    """
+
+    def __init__(self, ticket: Optional['AnyTicket']):
+        self.tickets: List[Optional[AnyTicket]] = []
+        self.priority = ticket.priority if ticket else INTERACTIVE
+        self._escalations: List[Callable[[int], None]] = []
+        self.add(ticket)
+
+    def add(self, ticket: Optional['AnyTicket']):
+        self.tickets.append(ticket)
+        if isinstance(ticket, TicketGroup):
+            ticket.on_escalate(self._escalate)
+        self._escalate(ticket.priority if ticket else INTERACTIVE)
+
+    def on_escalate(self, callback: Callable[[int], None]):
+        """Calls `callback` with the new priority whenever a more urgent update joins the group."""
+        self._escalations.append(callback)
+
+    def _escalate(self, priority: int):
+        if priority < self.priority:
+            self.priority = priority
+            for callback in self._escalations:
+                callback(priority)
+
+    def expired(self) -> bool:
+        return all(ticket is not None and ticket.expired() for ticket in self.tickets)
+
+
+AnyTicket = Union[Ticket, TicketGroup]
+
+# the ticket of the update being handled, which work submitted on its behalf is scheduled by
+current_ticket: ContextVar[Optional[AnyTicket]] = ContextVar('current_ticket', default=None)
+
+
+@dataclass(eq=False)
+class _Work:
+    ticket: Optional[AnyTicket]
+    future: Future
+    fn: Callable
+    args: tuple
+    # set by the thread that runs or sheds the work; it may be queued again at a higher priority before then
+    claimed: bool = False
+
+
+class PriorityExecutor:
+    """A thread pool that runs the most urgent work first and sheds work whose ticket has expired by the time a
+    thread is free to run it.
+
+    Work without a ticket runs at INTERACTIVE priority and is never shed.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._claim_lock = threading.Lock()
+        self.executed: Dict[int, int] = {}
+        self.shed: Dict[int, int] = {}
+        # longest a piece of work of each priority waited for a thread
+        self.max_wait: Dict[int, float] = {}
+        for i in range(max_workers):
+            threading.Thread(target=self._work, name=f'{thread_name_prefix}_{i}', daemon=True).start()
+
+    def submit(self, fn, *args, ticket: Optional[AnyTicket] = None) -> Future:
+        work = _Work(ticket, Future(), fn, args)
+        self._put(ticket.priority if ticket else INTERACTIVE, work)
+        if isinstance(ticket, TicketGroup):
+            # queued again when a more urgent update starts waiting for it, unless it has already been run or shed;
+            # whichever entry comes first runs it
+            def escalate(priority: int):
+                if not work.claimed:
+                    self._put(priority, work)
+
+            ticket.on_escalate(escalate)
+        return work.future
+
+    def _put(self, priority: int, work: _Work):
+        self._queue.put((priority, next(self._counter), time.monotonic(), work))
+
+    def _claim(self, work: _Work) -> bool:
+        with self._claim_lock:
+            if work.claimed:
+                return False
+            work.claimed = True
+            return True
+
+    def _work(self):
+        while True:
+            priority, _, submitted, work = self._queue.get()
+            # skip entries whose work was already taken from an entry queued at another priority
+            if not self._claim(work) or not work.future.set_running_or_notify_cancel():
+                continue
+            self.max_wait[priority] = max(self.max_wait.get(priority, 0), time.monotonic() - submitted)
+            if work.ticket is not None and work.ticket.expired():
+                self.shed[priority] = self.shed.get(priority, 0) + 1
+                work.future.set_exception(Shed())
+                continue
+            try:
+                result = work.fn(*work.args)
+            except BaseException as e:
+                work.future.set_exception(e)
+            else:
+                work.future.set_result(result)
+            self.executed[priority] = self.executed.get(priority, 0) + 1
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'executed': self.executed,
+            'shed': self.shed,
+            'max_wait': {p: round(w, 4) for p, w in self.max_wait.items()},
+        }
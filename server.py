@@ -1,9 +1,12 @@
 import asyncio
 import argparse
+import hashlib
 import json
 import logging
 import os
 import sys
+import time
+from collections import deque
 from typing import Optional
 
 import sentry_sdk
@@ -12,29 +15,199 @@ import tornado.httpclient
 import tornado.ioloop
 import tornado.web
 
+import cache
+import db
 import entries
+import localisation
 import log
-from app import lookup
+import matchups
+import priority
+import singleflight
+import stat_index
+from app import DEFAULT_LANGUAGE_ID, data_version, sessions, shared_cache
 
 # 40 characters should be more than enough to query anything in the Pokédex
 MAX_QUERY_LENGTH = 40
 
-
-def handle_text_message(message):
-    query = message['text'][:MAX_QUERY_LENGTH]
+# only this many inline results are rendered per answer, the rest are served as later pages
+INLINE_PAGE_SIZE = 10
+
+# how long Telegram may cache inline answers; our data only changes between releases so this can be long
+INLINE_CACHE_TIME = int(os.getenv('ROTOM_INLINE_CACHE_TIME', 86400))
+
+# concurrent identical requests share one in-progress lookup or render
+text_replies = singleflight.Group()
+inline_answers = singleflight.Group()
+sections = singleflight.Group()
+
+# (table, id) of the entries for recent inline queries, so that later pages do not need another lookup
+inline_hits = cache.LRUCache(maxsize=1024)
+
+
+class InlineAnswerTracker:
+    """Tracks whether inline answers are stable and how much inline traffic still reaches us.
+
+    `repeated` counts queries we already answered within the cache time, which Telegram's cache should have
+    absorbed.
+    """
+
+    def __init__(self, cache_time: int, maxsize: int = 4096):
+        self.cache_time = cache_time
+        self._answers = cache.LRUCache(maxsize=maxsize)
+        self.started = time.monotonic()
+        self.queries = 0
+        self.repeated = 0
+        self.changed = 0
+
+    def observe(self, query, offset, serialised_results, language_id=DEFAULT_LANGUAGE_ID) -> int:
+        """Records an answer and returns the cache time to send with it."""
+        self.queries += 1
+        key = (data_version, query, offset, language_id)
+        digest = hashlib.blake2b(serialised_results.encode(), digest_size=16).digest()
+        now = time.monotonic()
+        previous = self._answers.get(key)
+        self._answers.set(key, (digest, now))
+        if previous is None:
+            return self.cache_time
+        previous_digest, answered_at = previous
+        if previous_digest != digest:
+            self.changed += 1
+            return 0
+        if now - answered_at < self.cache_time:
+            self.repeated += 1
+        return self.cache_time
+
+    def stats(self):
+        minutes = max((time.monotonic() - self.started) / 60, 1 / 60)
+        return {
+            'data_version': data_version,
+            'cache_time': self.cache_time,
+            'queries': self.queries,
+            'queries_per_minute': round(self.queries / minutes, 2),
+            'repeated': self.repeated,
+            'changed': self.changed,
+        }
+
+
+inline_tracker = InlineAnswerTracker(INLINE_CACHE_TIME)
+
+# how urgently each kind of update is handled: users who tapped a button or sent a message are waiting for the
+# reply, while most inline queries are superseded by the next character typed
+PRIORITIES = {
+    'callback_query': priority.INTERACTIVE,
+    'message': priority.TEXT,
+    'inline_query': priority.INLINE,
+}
+
+# how long, in seconds, each kind of update may wait for the database before it is shed. Telegram gives up on
+# inline answers after a few seconds
+DEADLINES = {
+    'callback_query': float(os.getenv('ROTOM_CALLBACK_DEADLINE', 10)),
+    'message': float(os.getenv('ROTOM_MESSAGE_DEADLINE', 10)),
+    'inline_query': float(os.getenv('ROTOM_INLINE_DEADLINE', 3)),
+}
+
+BUSY_MESSAGE = 'Busy, please try again!'
+
+
+def classify(update) -> Optional[str]:
+    if 'message' in update and 'text' in update['message']:
+        return 'message'
+    for kind in ('inline_query', 'callback_query'):
+        if kind in update:
+            return kind
+    return None
+
+
+class Scheduler:
+    """Gives every update a priority.Ticket and records how long updates of each kind took and how many were shed.
+
+    A user's inline query supersedes their previous one, so any of its work still queued is shed: Telegram
+    discards answers to queries the user has already typed past.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        # user id -> ticket of their latest inline query
+        self._latest_inline = cache.LRUCache(maxsize=maxsize)
+        self.received = dict.fromkeys(PRIORITIES, 0)
+        self.shed = dict.fromkeys(PRIORITIES, 0)
+        self.superseded = 0
+        self._latencies = {kind: deque(maxlen=1024) for kind in PRIORITIES}
+
+    def admit(self, kind: str, update) -> priority.Ticket:
+        self.received[kind] += 1
+        ticket = priority.Ticket(PRIORITIES[kind], time.monotonic() + DEADLINES[kind])
+        if kind == 'inline_query':
+            user_id = update['inline_query']['from']['id']
+            previous = self._latest_inline.get(user_id)
+            if previous is not None:
+                previous.superseded = True
+            self._latest_inline.set(user_id, ticket)
+        return ticket
+
+    def done(self, kind: str, ticket: priority.Ticket, shed: bool):
+        if shed:
+            self.shed[kind] += 1
+            self.superseded += ticket.superseded
+        else:
+            self._latencies[kind].append(time.monotonic() - ticket.created)
+
+    def stats(self):
+        latencies = {}
+        for kind, recent in self._latencies.items():
+            recent = sorted(recent)
+            if recent:
+                latencies[kind] = {'p50': round(recent[len(recent) // 2], 4),
+                                   'p99': round(recent[min(len(recent) - 1, int(len(recent) * 0.99))], 4)}
+        return {
+            'received': self.received,
+            'shed': self.shed,
+            'superseded': self.superseded,
+            'latency': latencies,
+            'database': db.executor.stats(),
+        }
+
+
+scheduler = Scheduler()
+
+
+def normalise_query(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+
+async def render_section(table: str, id_: int, path: str,
+                         language_id: int = DEFAULT_LANGUAGE_ID) -> Optional[entries.Section]:
+    if table == stat_index.TABLE:
+        # a page of filter results: the id is the offset and the path is the query
+        return await sections.do((table, id_, path, language_id), db.run, stat_index.results_section, path, id_,
+                                 language_id)
+    return await sections.do((table, id_, path, language_id), db.section, table, id_, path, language_id)
+
+
+def language_of(update) -> int:
+    return localisation.language_id(update.get('from', {}).get('language_code'))
+
+
+async def reply_for_query(query, language_id=DEFAULT_LANGUAGE_ID):
+    special = matchups.parse(query)
+    if special:
+        return await db.run(matchups.answer, special), None
+    section = await render_section(stat_index.TABLE, 0, query, language_id) if stat_index.parse(query) else None
+    if section is None:
+        keys = await db.lookup(query)
+        section = await render_section(*keys[0], '', language_id) if keys else None
+    if section is None:
+        return None, None
+    return section.content, entries.reply_markup_for_section(section)
+
+
+async def handle_text_message(message):
+    query = normalise_query(message['text'][:MAX_QUERY_LENGTH])
     chat_id = message['chat']['id']
-    hits = lookup(query)
-    log.info(query=query, type='text_message', chat_id=chat_id, message_id=message['message_id'])
-    log.debug(hits=hits)
-    text = None
-    reply_markup = None
-    if hits:
-        best = hits[0].object
-        entry = entries.Entry.from_model(best)
-        if entry:
-            section = entry.default_section()
-            text = section.content
-            reply_markup = entries.reply_markup_for_section(section)
+    language_id = language_of(message)
+    log.info(query=query, type='text_message', chat_id=chat_id, message_id=message['message_id'],
+             language_id=language_id)
+    text, reply_markup = await text_replies.do((query, language_id), reply_for_query, query, language_id)
     text = text or 'No results!'
     response = {'method': 'sendMessage',
                 'chat_id': chat_id,
@@ -45,28 +218,62 @@ def handle_text_message(message):
     return response
 
 
-def handle_inline_query(inline_query):
-    query = inline_query['query'][:MAX_QUERY_LENGTH]
+async def entry_keys_for_query(query):
+    # random lookups give different entries every time, so they are not kept for later pages
+    cacheable = not entries.is_random_query(query)
+    keys = inline_hits.get(query) if cacheable else None
+    if keys is None:
+        keys = await db.run(stat_index.search_keys, query) if stat_index.parse(query) else []
+        keys = keys or await db.lookup(query)
+        if cacheable:
+            inline_hits.set(query, keys)
+    return keys
+
+
+async def inline_results_for_query(query, offset, language_id=DEFAULT_LANGUAGE_ID):
+    keys = await entry_keys_for_query(query)
+    results = await db.inline_results(keys[offset:offset + INLINE_PAGE_SIZE], language_id)
+    next_offset = str(offset + INLINE_PAGE_SIZE) if offset + INLINE_PAGE_SIZE < len(keys) else ''
+    return json.dumps(results) if results else '', next_offset
+
+
+def parse_offset(offset: str) -> int:
+    try:
+        return max(int(offset), 0)
+    except ValueError:
+        return 0
+
+
+async def handle_inline_query(inline_query):
+    query = normalise_query(inline_query['query'][:MAX_QUERY_LENGTH])
     inline_query_id = inline_query['id']
+    offset = parse_offset(inline_query.get('offset', ''))
+    language_id = language_of(inline_query)
+    next_offset = ''
     if query:
-        hits = lookup(query)
-        log.info(query=query, type='inline_query', inline_query_id=inline_query_id)
-        log.debug(hits=hits)
-        entries_ = filter(None, (entries.Entry.from_model(h.object) for h in hits))
-        results = list(entries.inline_result_for_entry(e) for e in entries_)
-        serialised_results = json.dumps(results) if results else ''
+        serialised_results, next_offset = await inline_answers.do(
+            (query, offset, language_id), inline_results_for_query, query, offset, language_id)
+        cache_time = inline_tracker.observe(query, offset, serialised_results, language_id)
+        if entries.is_random_query(query):
+            # nor should Telegram keep showing the same random entry
+            cache_time = 0
+        log.info(query=query, type='inline_query', inline_query_id=inline_query_id, offset=offset,
+                 cache_time=cache_time, data_version=data_version, language_id=language_id)
     else:
         serialised_results = ''
-    return {
+        cache_time = INLINE_CACHE_TIME
+    response = {
         'method': 'answerInlineQuery',
         'inline_query_id': inline_query_id,
         'results': serialised_results,
+        'cache_time': cache_time,
+        # results only depend on the query and, if we serve several languages, the user's language, so otherwise
+        # Telegram may share its cache between users
+        'is_personal': localisation.is_multilingual(),
     }
-
-
-def get_entry(table: str, id_: int) -> Optional[entries.Entry]:
-    if table == 'pokemon':
-        return entries.PokemonEntry.from_pokemon_id(id_)
+    if next_offset:
+        response['next_offset'] = next_offset
+    return response
 
 
 async def answer_callback_query(http_client, bot_token, callback_query, text=''):
@@ -101,11 +308,8 @@ async def update_message(http_client, bot_token, callback_query, text, reply_mar
 async def handle_callback_query(http_client, bot_token, callback_query):
     try:
         data = callback_query['data']
-        table, id_, path = data.split('/', maxsplit=3)
-        entry = get_entry(table, int(id_))
-        if entry is None:
-            raise ValueError
-        section = entry.section(path)
+        table, id_, path = data.split('/', maxsplit=2)
+        section = await render_section(table, int(id_), path, language_of(callback_query))
         if section is None:
             raise ValueError
         text = section.content
@@ -132,16 +336,40 @@ class WebhookHandler(tornado.web.RequestHandler):
     async def post(self):
         update = json.loads(self.request.body)
         log.debug(update=update)
-        if 'message' in update and 'text' in update['message']:
-            response = handle_text_message(update['message'])
-            self.write(response)
-        elif 'inline_query' in update:
-            response = handle_inline_query(update['inline_query'])
+        kind = classify(update)
+        if kind is None:
+            return
+        if not localisation.loaded():
+            # normally loaded by db.build_indexes() at startup
+            await db.run(localisation.load)
+        ticket = scheduler.admit(kind, update)
+        token = priority.current_ticket.set(ticket)
+        shed = False
+        try:
+            if kind == 'message':
+                response = await handle_text_message(update['message'])
+            elif kind == 'inline_query':
+                response = await handle_inline_query(update['inline_query'])
+            else:
+                response = await handle_callback_query(self.http_client, self.bot_token, update['callback_query'])
+        except priority.Shed:
+            shed = True
+            response = shed_response(kind, update)
+        finally:
+            priority.current_ticket.reset(token)
+        scheduler.done(kind, ticket, shed)
+        if response:
             self.write(response)
-        elif 'callback_query' in update:
-            response = await handle_callback_query(self.http_client, self.bot_token, update['callback_query'])
-            if response:
-                self.write(response)
+
+
+def shed_response(kind: str, update) -> Optional[dict]:
+    if kind == 'message':
+        return {'method': 'sendMessage', 'chat_id': update['message']['chat']['id'], 'text': BUSY_MESSAGE}
+    elif kind == 'callback_query':
+        return {'method': 'answerCallbackQuery', 'callback_query_id': update['callback_query']['id'],
+                'text': BUSY_MESSAGE}
+    # the user has typed past a shed inline query or Telegram has stopped waiting for it, so it is not answered
+    return None
 
 
 class HealthHandler(tornado.web.RequestHandler):
@@ -149,6 +377,29 @@ class HealthHandler(tornado.web.RequestHandler):
         pass
 
 
+def stats():
+    return {
+        'singleflight': {
+            'text_replies': text_replies.stats(),
+            'inline_answers': inline_answers.stats(),
+            'sections': sections.stats(),
+        },
+        'section_cache': entries.section_cache.stats(),
+        'lookup_cache': entries.lookup_cache.stats(),
+        'shared_cache': shared_cache.stats() if shared_cache else None,
+        'inline_hits': inline_hits.stats(),
+        'inline_answers': inline_tracker.stats(),
+        'sessions': sessions.stats(),
+        'scheduler': scheduler.stats(),
+        'language_memory_bytes': localisation.memory_report(),
+    }
+
+
+class StatsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.write(stats())
+
+
 def set_webhook(bot_token, host):
     client = tornado.httpclient.HTTPClient()
     webhook_url = f'https://{host}/webhook'
@@ -167,6 +418,7 @@ def make_app(bot_token):
     return tornado.web.Application([
         ('/webhook', WebhookHandler, {'bot_token': bot_token, 'http_client': http_client}),
         ('/health', HealthHandler),
+        ('/stats', StatsHandler),
     ])
 
 
@@ -198,6 +450,8 @@ if __name__ == "__main__":
 
         set_webhook(bot_token, host)
 
+    db.build_indexes()
+
     app = make_app(bot_token)
 
     port = args.port or os.getenv('PORT') or 8080
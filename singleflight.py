@@ -0,0 +1,60 @@
+import asyncio
+import functools
+import inspect
+from typing import Dict, Hashable, Tuple
+
+import priority
+
+
+class Group:
+    """Coalesces concurrent calls with the same key into a single execution.
+
+    Callers that arrive while a call for their key is still in flight await the
+    result of that call instead of starting their own. Coroutine functions are
+    awaited on the event loop and plain callables are run in `executor`.
+
+    The shared call runs with a priority.TicketGroup of every caller's ticket as
+    the current ticket, so it is as urgent as its most urgent caller and is only
+    shed once every caller's ticket has expired.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, Tuple[asyncio.Future, priority.TicketGroup]] = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def do(self, key, fn, *args, executor=None):
+        self.calls += 1
+        ticket = priority.current_ticket.get()
+        if key in self._in_flight:
+            future, tickets = self._in_flight[key]
+            tickets.add(ticket)
+        else:
+            self.executions += 1
+            tickets = priority.TicketGroup(ticket)
+            future = asyncio.ensure_future(self._run(tickets, fn, args, executor))
+            self._in_flight[key] = future, tickets
+            future.add_done_callback(functools.partial(self._forget, key))
+        # shield the shared call so that one caller being cancelled does not cancel it for everyone else
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if key in self._in_flight and self._in_flight[key][0] is future:
+            del self._in_flight[key]
+
+    @staticmethod
+    async def _run(tickets, fn, args, executor):
+        # the task runs in a copy of the first caller's context, so this does not change the callers' tickets
+        priority.current_ticket.set(tickets)
+        if inspect.iscoroutinefunction(fn):
+            return await fn(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(fn, *args))
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'executions': self.executions,
+            'shared': self.calls - self.executions,
+            'in_flight': len(self._in_flight),
+        }
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+from typing import Optional
+from urllib.request import pathname2url
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine.url import make_url
+
+import app
+
+# the evolution chains of these species, which the tests render, are kept whole in the snapshot
+SPECIES = ('bulbasaur', 'pikachu', 'gloom', 'sharpedo', 'silcoon', 'machamp', 'scizor', 'deoxys')
+# as is every Pokémon of these generations, so sections listing many Pokémon have realistic sizes
+GENERATIONS = (1,)
+
+# the largest tables, keyed by Pokémon or species, which are trimmed to the snapshot's Pokémon
+TRIMMED_TABLES = (
+    ('pokemon_moves', 'pokemon_id', 'snapshot_pokemon'),
+    ('encounters', 'pokemon_id', 'snapshot_pokemon'),
+    ('pokemon_species_flavor_text', 'species_id', 'snapshot_species'),
+)
+
+NAME = 'rotom-snapshot'
+
+# the connection that keeps the in-memory snapshot alive
+_keeper: Optional[sqlite3.Connection] = None
+
+
+def _trim(conn: sqlite3.Connection):
+    species = ', '.join('?' * len(SPECIES))
+    generations = ', '.join('?' * len(GENERATIONS))
+    conn.execute(f'''CREATE TEMP TABLE snapshot_species AS
+        SELECT id FROM pokemon_species
+        WHERE generation_id IN ({generations})
+           OR evolution_chain_id IN (SELECT evolution_chain_id FROM pokemon_species WHERE identifier IN ({species}))''',
+                 GENERATIONS + SPECIES)
+    conn.execute('''CREATE TEMP TABLE snapshot_pokemon AS
+        SELECT id FROM pokemon WHERE species_id IN (SELECT id FROM snapshot_species)''')
+    conn.execute('''DELETE FROM encounter_condition_value_map WHERE encounter_id IN
+        (SELECT id FROM encounters WHERE pokemon_id NOT IN (SELECT id FROM snapshot_pokemon))''')
+    for table, column, kept in TRIMMED_TABLES:
+        conn.execute(f'DELETE FROM {table} WHERE {column} NOT IN (SELECT id FROM {kept})')
+    conn.execute('DROP TABLE snapshot_species')
+    conn.execute('DROP TABLE snapshot_pokemon')
+    conn.commit()
+    # release the deleted rows' pages, which would otherwise stay allocated in memory
+    conn.execute('VACUUM')
+
+
+def engine(uri: str = app.DB_URI):
+    """Returns an engine for an in-memory copy of the Pokédex at `uri` with the largest tables trimmed, creating
+    the copy on first use.
+
+    The copy is deterministic and private to this process, so parallel test workers each build their own.
+    """
+    global _keeper
+    target = f'file:{NAME}?mode=memory&cache=shared'
+    if _keeper is None:
+        path = os.path.abspath(make_url(uri).database)
+        source = sqlite3.connect(f'file:{pathname2url(path)}?mode=ro', uri=True)
+        keeper = sqlite3.connect(target, uri=True, check_same_thread=False)
+        source.backup(keeper)
+        source.close()
+        _trim(keeper)
+        _keeper = keeper
+    return create_engine('sqlite://', **app.sqlite_engine_options(target))
+
+
+def use(uri: str = app.DB_URI):
+    """Rebinds the session to the snapshot."""
+    app.bind(engine(uri))
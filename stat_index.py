@@ -0,0 +1,243 @@
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from pokedex.db import tables
+
+import bitsets
+import localisation
+from app import DEFAULT_LANGUAGE_ID, session
+from entries import Section, SectionReference
+
+# callback data for a page of results is filter/<offset>/<query>
+TABLE = 'filter'
+PAGE_SIZE = 10
+# Telegram's limit on the length of callback data
+MAX_CALLBACK_DATA_LENGTH = 64
+# characters that start an entity in Telegram's Markdown
+MARKDOWN_ENTITY = re.compile(r'([_*`\[])')
+
+# names users can filter and sort by, and the column each refers to
+COLUMN_ALIASES = {
+    'hp': 'hp',
+    'attack': 'attack', 'atk': 'attack',
+    'defense': 'defense', 'def': 'defense',
+    'spatk': 'special-attack', 'spa': 'special-attack', 'special-attack': 'special-attack',
+    'spdef': 'special-defense', 'spd': 'special-defense', 'special-defense': 'special-defense',
+    'speed': 'speed', 'spe': 'speed',
+    'total': 'total', 'bst': 'total',
+    'height': 'height',
+    'weight': 'weight',
+}
+COLUMN_NAMES = {
+    'hp': 'HP', 'attack': 'Attack', 'defense': 'Defense', 'special-attack': 'Sp. Atk', 'special-defense': 'Sp. Def',
+    'speed': 'Speed', 'total': 'Total', 'height': 'Height', 'weight': 'Weight',
+}
+STAT_IDENTIFIERS = ('hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed')
+# heights and weights are stored in decimetres and hectograms but users filter in metres and kilograms
+COLUMN_SCALES = {'height': 10, 'weight': 10}
+
+TERM = re.compile(r'^(?P<field>[a-z.-]+)(?P<op>>=|<=|!=|>|<|=|:)(?P<value>[\w.-]+)$')
+
+
+@dataclass(frozen=True)
+class Comparison:
+    column: str
+    op: str
+    value: int
+
+
+@dataclass(frozen=True)
+class Filter:
+    comparisons: Tuple[Comparison, ...] = ()
+    types: Tuple[str, ...] = ()
+    abilities: Tuple[str, ...] = ()
+    sort: Optional[str] = None
+    descending: bool = True
+
+
+def _normalise_identifier(name: str) -> str:
+    return name.replace('-', '').replace('_', '').replace(' ', '')
+
+
+def parse(query: str) -> Optional[Filter]:
+    """Parses a filter query such as "speed>120 type:dragon sort:attack", or returns None if it is not one.
+
+    Every term must be a comparison on a stat, height or weight, `type:`, `ability:`, or `sort:`, which sorts by
+    a column in descending order, or in ascending order if the column is prefixed with a minus sign.
+    """
+    query = re.sub(r'\s*(>=|<=|!=|>|<|=|:)\s*', r'\1', query.lower())
+    comparisons, types, abilities = [], [], []
+    sort, descending = None, True
+    for term in query.split():
+        m = TERM.match(term)
+        if not m:
+            return None
+        field, op, value = m.group('field', 'op', 'value')
+        if op == ':' and field == 'type':
+            types.append(value)
+        elif op == ':' and field == 'ability':
+            abilities.append(_normalise_identifier(value))
+        elif op == ':' and field == 'sort':
+            descending = not value.startswith('-')
+            sort = COLUMN_ALIASES.get(value.lstrip('-'))
+            if sort is None:
+                return None
+        elif op != ':' and field in COLUMN_ALIASES:
+            column = COLUMN_ALIASES[field]
+            try:
+                number = round(float(value) * COLUMN_SCALES.get(column, 1))
+            except (ValueError, OverflowError):
+                # not a number, or infinite as in "speed>inf" or "hp>1e999"
+                return None
+            comparisons.append(Comparison(column, op, number))
+        else:
+            return None
+    if not (comparisons or types or abilities):
+        return None
+    if sort is None and comparisons:
+        sort = comparisons[0].column
+    return Filter(tuple(comparisons), tuple(types), tuple(abilities), sort, descending)
+
+
+class Column:
+    """Values of one attribute for every Pokémon, with the bitmaps needed to answer comparisons in O(log n)."""
+
+    def __init__(self, values: array):
+        self.values = values
+        self.order = array('H', sorted(range(len(values)), key=values.__getitem__))
+        self.sorted_values = array(values.typecode, (values[p] for p in self.order))
+        # suffixes[i] is the bitmap of the Pokémon at order[i:]
+        self.suffixes = [0] * (len(values) + 1)
+        for i in reversed(range(len(values))):
+            self.suffixes[i] = self.suffixes[i + 1] | (1 << self.order[i])
+
+    def mask(self, op: str, value: int) -> int:
+        everything = self.suffixes[0]
+        lo = bisect_left(self.sorted_values, value)
+        hi = bisect_right(self.sorted_values, value)
+        if op == '>':
+            return self.suffixes[hi]
+        elif op == '>=':
+            return self.suffixes[lo]
+        elif op == '<':
+            return everything ^ self.suffixes[lo]
+        elif op == '<=':
+            return everything ^ self.suffixes[hi]
+        elif op == '=':
+            return self.suffixes[lo] ^ self.suffixes[hi]
+        return everything ^ self.suffixes[lo] ^ self.suffixes[hi]
+
+
+class StatIndex:
+    """Base stats, types, abilities, height and weight of every Pokémon as columns, so filters are bitmap
+    operations rather than SQL."""
+
+    def __init__(self):
+        self.pokemon_ids = array('H')
+        # pokemon id -> position in pokemon_ids and every column
+        self.positions: Dict[int, int] = {}
+        self.columns: Dict[str, Column] = {}
+        # type and ability identifier -> bitmap of the Pokémon that have it
+        self.types: Dict[str, int] = {}
+        self.abilities: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, session) -> 'StatIndex':
+        index = cls()
+        rows = session.query(tables.Pokemon.id, tables.Pokemon.height, tables.Pokemon.weight) \
+            .order_by(tables.Pokemon.id).all()
+        index.pokemon_ids = array('H', (id_ for id_, _, _ in rows))
+        position = index.positions = {id_: i for i, id_ in enumerate(index.pokemon_ids)}
+        index.columns['height'] = Column(array('H', (height for _, height, _ in rows)))
+        index.columns['weight'] = Column(array('H', (weight for _, _, weight in rows)))
+
+        stats = {identifier: array('H', [0] * len(rows)) for identifier in STAT_IDENTIFIERS}
+        ps = tables.PokemonStat
+        for pokemon_id, identifier, base_stat in session.query(ps.pokemon_id, tables.Stat.identifier, ps.base_stat) \
+                .join(tables.Stat, tables.Stat.id == ps.stat_id) \
+                .filter(tables.Stat.identifier.in_(STAT_IDENTIFIERS)):
+            stats[identifier][position[pokemon_id]] = base_stat
+        for identifier, values in stats.items():
+            index.columns[identifier] = Column(values)
+        index.columns['total'] = Column(array('H', map(sum, zip(*stats.values()))))
+
+        pt = tables.PokemonType
+        for pokemon_id, identifier in session.query(pt.pokemon_id, tables.Type.identifier) \
+                .join(tables.Type, tables.Type.id == pt.type_id):
+            index.types[identifier] = index.types.get(identifier, 0) | (1 << position[pokemon_id])
+        pa = tables.PokemonAbility
+        for pokemon_id, identifier in session.query(pa.pokemon_id, tables.Ability.identifier) \
+                .join(tables.Ability, tables.Ability.id == pa.ability_id):
+            key = _normalise_identifier(identifier)
+            index.abilities[key] = index.abilities.get(key, 0) | (1 << position[pokemon_id])
+        return index
+
+    def search(self, f: Filter) -> List[int]:
+        """Returns the ids of the Pokémon matching a filter, in its sort order."""
+        mask = (1 << len(self.pokemon_ids)) - 1
+        for c in f.comparisons:
+            mask &= self.columns[c.column].mask(c.op, c.value)
+        for identifier in f.types:
+            mask &= self.types.get(identifier, 0)
+        for identifier in f.abilities:
+            mask &= self.abilities.get(identifier, 0)
+        if f.sort is None:
+            positions = bitsets.iter_positions(mask)
+        else:
+            order = self.columns[f.sort].order
+            positions = (p for p in (reversed(order) if f.descending else order) if mask >> p & 1)
+        return [self.pokemon_ids[p] for p in positions]
+
+    def value(self, column: str, pokemon_id: int) -> str:
+        value = self.columns[column].values[self.positions[pokemon_id]]
+        scale = COLUMN_SCALES.get(column)
+        return f'{value / scale:g}' if scale else str(value)
+
+
+def results_section(query: str, offset: int, language_id: int = DEFAULT_LANGUAGE_ID) -> Optional[Section]:
+    """Renders a page of the Pokémon matching a filter query, or returns None if nothing matches."""
+    f = parse(query)
+    if f is None:
+        return None
+    index = stat_index()
+    pokemon_ids = index.search(f)
+    if not pokemon_ids:
+        return None
+    page = pokemon_ids[offset:offset + PAGE_SIZE]
+    t = localisation.get(language_id)
+    lines = []
+    children = []
+    for id_ in page:
+        title = f'{t.name("pokemon", id_)} (#{id_:03})'
+        lines.append(f'{title} - {COLUMN_NAMES[f.sort]} {index.value(f.sort, id_)}' if f.sort else title)
+        children.append(SectionReference(title, f'pokemon/{id_}/'))
+    next_page = f'{TABLE}/{offset + PAGE_SIZE}/{query}'
+    if offset + PAGE_SIZE < len(pokemon_ids) and len(next_page.encode()) <= MAX_CALLBACK_DATA_LENGTH:
+        children.append(SectionReference('Next', next_page))
+    parent = SectionReference('', f'{TABLE}/{max(offset - PAGE_SIZE, 0)}/{query}') if offset else None
+    # entities can't be escaped inside bold text, so the query follows it
+    escaped_query = MARKDOWN_ENTITY.sub(r'\\\1', query)
+    content = f'*Filter:* {escaped_query}\n{len(pokemon_ids)} Pokémon found\n\n' + '\n'.join(lines)
+    return Section(content, parent=parent, children=tuple(children))
+
+
+def search_keys(query: str) -> List[Tuple[str, int]]:
+    f = parse(query)
+    return [('pokemon', id_) for id_ in stat_index().search(f)] if f else []
+
+
+_index: Optional[StatIndex] = None
+_lock = threading.Lock()
+
+
+def stat_index() -> StatIndex:
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = StatIndex.build(session)
+    return _index
@@ -1,2 +1,4 @@
+from fixtures.database import *
+from fixtures.memcached import *
 from fixtures.pokemon import *
 from fixtures.entries import *
@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.fixture(scope='session')
+def snapshot_database():
+    """Runs the tests that use it against an in-memory snapshot of the Pokédex, built once per test process.
+
+    Tests that need no database do not use it, so they also pass without a Pokédex.
+    """
+    import app
+    import snapshot
+    previous = app.session.bind
+    snapshot.use()
+    yield
+    app.bind(previous)
+
+
+@pytest.fixture
+def session(snapshot_database):
+    import app
+    return app.session
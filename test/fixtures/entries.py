@@ -1,13 +1,14 @@
 import pytest
 
-from entries import PokemonEntry
-
 
+# entries is imported by the fixtures rather than the module, so that collecting the tests needs no Pokédex
 @pytest.fixture
 def pikachu_entry(pikachu):
+    from entries import PokemonEntry
     return PokemonEntry(pikachu)
 
 
 @pytest.fixture
 def mega_sharpedo_entry(mega_sharpedo):
+    from entries import PokemonEntry
     return PokemonEntry(mega_sharpedo)
@@ -0,0 +1,60 @@
+import socket
+import socketserver
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+import pytest
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """Speaks just enough of the memcached text protocol for the client: get and set."""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, key, *args = line.split()
+            if command == b'get':
+                value = self.server.store.get(key)
+                if value is not None:
+                    self.wfile.write(b'VALUE %s 0 %d\r\n%s\r\n' % (key, len(value), value))
+                self.wfile.write(b'END\r\n')
+            elif command == b'set':
+                self.server.store[key] = self.rfile.read(int(args[2]) + 2)[:-2]
+                self.wfile.write(b'STORED\r\n')
+            else:
+                self.wfile.write(b'ERROR\r\n')
+
+
+@dataclass
+class MemcachedServer:
+    address: str
+    process: subprocess.Popen
+
+
+@pytest.fixture
+def memcached_server(tmp_path):
+    """A stand-in memcached listening on a Unix socket in another process."""
+    address = str(tmp_path / 'memcached.sock')
+    process = subprocess.Popen([sys.executable, __file__, address])
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            with socket.socket(socket.AF_UNIX) as sock:
+                sock.connect(address)
+            break
+        except OSError:
+            assert time.monotonic() < deadline and process.poll() is None, 'stand-in memcached did not start'
+            time.sleep(0.01)
+    yield MemcachedServer(address, process)
+    process.kill()
+    process.wait()
+
+
+if __name__ == '__main__':
+    server = socketserver.ThreadingUnixStreamServer(sys.argv[1], Handler)
+    server.store = {}
+    server.serve_forever()
@@ -0,0 +1,36 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import engine_options
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / 'pokedex.sqlite'
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE pokemon (id INTEGER PRIMARY KEY, identifier TEXT)')
+    conn.execute("INSERT INTO pokemon VALUES (25, 'pikachu')")
+    conn.commit()
+    conn.close()
+    return f'sqlite:///{path}'
+
+
+@pytest.mark.parametrize('mode', ['readonly', 'memory'])
+def test_engine_options(database, mode):
+    engine = create_engine(database, **engine_options(database, mode))
+    with engine.connect() as conn:
+        assert conn.execute('SELECT identifier FROM pokemon WHERE id = 25').scalar() == 'pikachu'
+        assert conn.execute('PRAGMA query_only').scalar() == 1
+        with pytest.raises(Exception):
+            conn.execute("INSERT INTO pokemon VALUES (1, 'bulbasaur')")
+
+
+def test_default_engine_options(database):
+    assert engine_options(database, 'default') == {}
+
+
+def test_unknown_mode(database):
+    with pytest.raises(ValueError):
+        engine_options(database, 'nonexistent')
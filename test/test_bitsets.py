@@ -0,0 +1,13 @@
+import bitsets
+
+
+def test_round_trip():
+    positions = [0, 3, 64, 1000]
+    bits = bitsets.from_positions(positions)
+    assert list(bitsets.iter_positions(bits)) == positions
+    assert bitsets.count(bits) == 4
+
+
+def test_empty():
+    assert bitsets.from_positions([]) == 0
+    assert list(bitsets.iter_positions(0)) == []
@@ -0,0 +1,60 @@
+from cache import LRUCache, TieredCache
+from memcached import Client
+
+
+class TestLRUCache:
+    def test_get_missing(self):
+        c = LRUCache()
+        assert c.get('missing') is None
+        assert c.get('missing', 1) == 1
+        assert c.stats()['misses'] == 2
+
+    def test_set_and_get(self):
+        c = LRUCache()
+        c.set('a', 1)
+        assert c.get('a') == 1
+        assert 'a' in c
+        assert c.stats()['hits'] == 1
+
+    def test_evicts_least_recently_used(self):
+        c = LRUCache(maxsize=2)
+        c.set('a', 1)
+        c.set('b', 2)
+        c.get('a')
+        c.set('c', 3)
+        assert 'a' in c
+        assert 'b' not in c
+        assert 'c' in c
+        assert len(c) == 2
+
+
+def make_tiered_cache(address, version='v1'):
+    return TieredCache(LRUCache(), Client(address), 'test', version, str.encode, bytes.decode)
+
+
+class TestTieredCache:
+    def test_without_shared_cache(self):
+        c = TieredCache(LRUCache(), None, 'test', 'v1', str.encode, bytes.decode)
+        c.set('a', 'value')
+        assert c.get('a') == 'value'
+        assert c.get('b') is None
+
+    def test_shared_between_replicas(self, memcached_server):
+        first = make_tiered_cache(memcached_server.address)
+        second = make_tiered_cache(memcached_server.address)
+        first.set(('pokemon/1', '', 9), 'Bulbasaur')
+        assert ('pokemon/1', '', 9) not in second
+        assert second.get(('pokemon/1', '', 9)) == 'Bulbasaur'
+        assert ('pokemon/1', '', 9) in second
+        assert second.stats()['shared_hits'] == 1
+
+    def test_keys_are_versioned(self, memcached_server):
+        make_tiered_cache(memcached_server.address, 'v1').set('a', 'old')
+        assert make_tiered_cache(memcached_server.address, 'v2').get('a') is None
+
+    def test_shared_cache_unavailable(self, tmp_path):
+        c = make_tiered_cache(str(tmp_path / 'nothing.sock'))
+        c.set('a', 'value')
+        assert c.get('a') == 'value'
+        c.clear()
+        assert c.get('a') is None
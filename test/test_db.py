@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+import pytest
+
+import db
+
+pytestmark = pytest.mark.usefixtures('snapshot_database')
+
+
+def test_run_uses_database_thread():
+    name = asyncio.run(db.run(lambda: threading.current_thread().name))
+    assert name.startswith('db')
+
+
+def test_lookup():
+    keys = asyncio.run(db.lookup('bulbasaur'))
+    assert keys[0] == ('pokemon', 1)
+
+
+def test_section():
+    section = asyncio.run(db.section('pokemon', 1, 'base_stats'))
+    assert section.content.startswith('*Bulbasaur (#001)*')
+
+
+def test_nonexistent_section():
+    assert asyncio.run(db.section('pokemon', -1, '')) is None
@@ -0,0 +1,29 @@
+import pytest
+
+from pokedex.db import tables
+
+import encounters
+from app import session
+
+pytestmark = pytest.mark.usefixtures('snapshot_database')
+
+
+def test_runs_cover_every_encounter():
+    e = tables.Encounter
+    expected = set(session.query(e.version_id, tables.LocationArea.location_id)
+                   .join(tables.LocationArea, tables.LocationArea.id == e.location_area_id)
+                   .filter(e.pokemon_id == 25))
+    actual = {(version_id, location_id)
+              for versions, locations in encounters.index().locations_of(25)
+              for version_id in versions
+              for location_id in locations}
+    assert actual == expected
+
+
+def test_consecutive_runs_differ():
+    runs = encounters.index().locations_of(25)
+    assert all(a[1] != b[1] for a, b in zip(runs, runs[1:]))
+
+
+def test_not_found_in_the_wild():
+    assert encounters.index().locations_of(212) == ()
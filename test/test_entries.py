@@ -1,13 +1,10 @@
 import pytest
 
-from pokedex.db import connect
+from pokedex.db import tables, util
 
 from entries import *
 
-
-@pytest.fixture
-def session():
-    return connect()
+pytestmark = pytest.mark.usefixtures('snapshot_database')
 
 
 @pytest.fixture
@@ -110,6 +107,24 @@ class TestEntry:
         assert isinstance(entry, MoveEntry)
         assert entry.move == move
 
+    @pytest.mark.parametrize(('table', 'fixture', 'cls'), [
+        ('pokemon', 'pokemon', PokemonEntry),
+        ('item', 'item', ItemEntry),
+        ('ability', 'ability', AbilityEntry),
+        ('move', 'move', MoveEntry),
+    ])
+    def test_get_entry(self, request, table, fixture, cls):
+        model = request.getfixturevalue(fixture)
+        entry = get_entry(table, model.id)
+        assert isinstance(entry, cls)
+        assert entry.slug == f'{table}/{model.id}'
+
+    def test_get_entry_unknown_table(self):
+        assert get_entry('nature', 1) is None
+
+    def test_get_entry_nonexistent_id(self):
+        assert get_entry('item', -1) is None
+
 
 class TestPokemonEntry:
     def test_slug(self, pokemon_entry):
@@ -162,12 +177,13 @@ Hidden ability: Chlorophyll
 Height: 0.7 m
 Weight: 6.9 kg
 [Image](https://assets.pokemon.com/assets/cms2/img/pokedex/full/001.png)''',
-            children=[
+            children=(
                 SectionReference('Base stats', 'pokemon/1/base_stats'),
                 SectionReference('Evolutions', 'pokemon/1/evolutions'),
                 SectionReference('Locations', 'pokemon/1/locations'),
                 SectionReference('Flavour text', 'pokemon/1/flavour_text'),
-            ])
+                SectionReference('Learnset', 'pokemon/1/learnset'),
+            ))
         assert actual == expected
 
     def test_base_stats_section(self, pokemon_entry: PokemonEntry):
@@ -184,11 +200,12 @@ Speed:    45 ======
 Total:   318
 ```''',
             parent=SectionReference('', 'pokemon/1/'),
-            siblings=[
+            siblings=(
                 SectionReference('Evolutions', 'pokemon/1/evolutions'),
                 SectionReference('Locations', 'pokemon/1/locations'),
                 SectionReference('Flavour text', 'pokemon/1/flavour_text'),
-            ]
+                SectionReference('Learnset', 'pokemon/1/learnset'),
+            )
         )
         assert actual == expected
 
@@ -217,6 +234,7 @@ Weight: 6.9 kg
                     [{'text': 'Evolutions', 'callback_data': 'pokemon/1/evolutions'}],
                     [{'text': 'Locations', 'callback_data': 'pokemon/1/locations'}],
                     [{'text': 'Flavour text', 'callback_data': 'pokemon/1/flavour_text'}],
+                    [{'text': 'Learnset', 'callback_data': 'pokemon/1/learnset'}],
                 ],
             },
             'thumb_url': 'https://assets.pokemon.com/assets/cms2/img/pokedex/detail/001.png'}
@@ -230,9 +248,9 @@ Weight: 6.9 kg
 `  └` Vileplume (#045) using a Leaf Stone
 `  └` Bellossom (#182) using a Sun Stone''',
             parent=SectionReference('', 'pokemon/44/'),
-            children=[SectionReference('Oddish (#043)', 'pokemon/43/'),
+            children=(SectionReference('Oddish (#043)', 'pokemon/43/'),
                       SectionReference('Vileplume (#045)', 'pokemon/45/'),
-                      SectionReference('Bellossom (#182)', 'pokemon/182/')]
+                      SectionReference('Bellossom (#182)', 'pokemon/182/'))
         )
         actual = gloom_entry.section('evolutions')
         assert actual == expected
@@ -243,8 +261,8 @@ Weight: 6.9 kg
 `└` Machoke (#067) at level 28
 `  └` *Machamp (#068)* when traded''',
             parent=SectionReference('', 'pokemon/68/'),
-            children=[SectionReference(name='Machop (#066)', path='pokemon/66/'),
-                      SectionReference(name='Machoke (#067)', path='pokemon/67/')])
+            children=(SectionReference(name='Machop (#066)', path='pokemon/66/'),
+                      SectionReference(name='Machoke (#067)', path='pokemon/67/')))
         actual = machamp_entry.section('evolutions')
         assert actual == expected
 
@@ -253,7 +271,7 @@ Weight: 6.9 kg
             content='''Scyther (#123)
 `└` *Scizor (#212)* when traded holding a Metal Coat''',
             parent=SectionReference('', 'pokemon/212/'),
-            children=[SectionReference(name='Scyther (#123)', path='pokemon/123/')])
+            children=(SectionReference(name='Scyther (#123)', path='pokemon/123/'),))
         actual = scizor_entry.section('evolutions')
         assert actual == expected
 
@@ -270,11 +288,12 @@ Locations
         expected = Section(
             content,
             parent=SectionReference('', 'pokemon/25/'),
-            siblings=[
+            siblings=(
                 SectionReference('Base stats', 'pokemon/25/base_stats'),
                 SectionReference('Evolutions', 'pokemon/25/evolutions'),
                 SectionReference('Flavour text', 'pokemon/25/flavour_text'),
-            ])
+                SectionReference('Learnset', 'pokemon/25/learnset'),
+            ))
         actual = pikachu_entry.section('locations')
         assert actual == expected
 
@@ -286,11 +305,12 @@ Not found in the wild'''
         expected = Section(
             content,
             parent=SectionReference('', 'pokemon/212/'),
-            siblings=[
+            siblings=(
                 SectionReference('Base stats', 'pokemon/212/base_stats'),
                 SectionReference('Evolutions', 'pokemon/212/evolutions'),
                 SectionReference('Flavour text', 'pokemon/212/flavour_text'),
-            ])
+                SectionReference('Learnset', 'pokemon/212/learnset'),
+            ))
         actual = scizor_entry.section('locations')
         assert actual == expected
 
@@ -311,15 +331,33 @@ Flavour text
         expected = Section(
             content,
             parent=SectionReference('', 'pokemon/1/'),
-            siblings=[
+            siblings=(
                 SectionReference('Base stats', 'pokemon/1/base_stats'),
                 SectionReference('Evolutions', 'pokemon/1/evolutions'),
                 SectionReference('Locations', 'pokemon/1/locations'),
-            ]
+                SectionReference('Learnset', 'pokemon/1/learnset'),
+            )
         )
         actual = pokemon_entry.section('flavour_text')
         assert actual == expected
 
+    def test_learnset(self, pokemon_entry):
+        section = pokemon_entry.section('learnset/1')
+        assert section.content.startswith('*Bulbasaur (#001)*\nLearnset (Red, Blue)\n\n*Level up:* L1 ')
+        assert 'L7 Leech Seed, L13 Vine Whip' in section.content
+        assert section.parent == SectionReference('', 'pokemon/1/')
+        assert SectionReference('Yellow', 'pokemon/1/learnset/2') in section.children
+        assert SectionReference('Red, Blue', 'pokemon/1/learnset/1') not in section.children
+
+    def test_learnset_defaults_to_latest_version_group(self, pokemon_entry):
+        latest = pokemon_entry.section('learnset')
+        assert latest.children[-1].path != 'pokemon/1/learnset/1'
+        assert SectionReference('Red, Blue', 'pokemon/1/learnset/1') in latest.children
+
+    @pytest.mark.parametrize('path', ['learnset/999', 'learnset/red-blue'])
+    def test_nonexistent_learnset(self, pokemon_entry, path):
+        assert pokemon_entry.section(path) is None
+
 
 class TestItemEntry:
     def test_slug(self, item_entry):
@@ -428,10 +466,23 @@ Type: Psychic
 Power: 140
 Accuracy: 90
 PP: 5
-Inflicts regular damage, then lowers the user's Special Attack by two stages.''')
+Inflicts regular damage, then lowers the user's Special Attack by two stages.''',
+            children=(SectionReference('Learned by', 'move/354/learners'),))
         actual = move_entry.default_section()
         assert actual == expected
 
+    def test_learners_section(self, move_entry):
+        section = move_entry.section('learners')
+        assert section.content.startswith('*Psycho Boost* (move)\nLearned by\n\n*Level up (')
+        assert 'Deoxys' in section.content
+        assert section.parent == SectionReference('', 'move/354/')
+
+    def test_learners_section_is_truncated(self, session):
+        protect = util.get(session, tables.Move, 'protect')
+        section = MoveEntry(protect).section('learners')
+        assert len(section.content) <= MAX_MESSAGE_LENGTH
+        assert ' more' in section.content
+
     def test_inline_result(self, move_entry):
         expected = {
             'type': 'article',
@@ -447,6 +498,9 @@ Inflicts regular damage, then lowers the user's Special Attack by two stages.'''
                 'parse_mode': 'Markdown',
             },
             'description': "Lowers the user's Special Attack by two stages after inflicting damage.",
+            'reply_markup': {
+                'inline_keyboard': [[{'text': 'Learned by', 'callback_data': 'move/354/learners'}]],
+            },
         }
         actual = inline_result_for_entry(move_entry)
         assert actual == expected
@@ -463,3 +517,52 @@ def test_reply_markup_for_section(section, reply_markup):
     expected = {'inline_keyboard': [[{'text': text, 'callback_data': data}]
                                     for text, data in reply_markup]} if reply_markup else None
     assert reply_markup_for_section(section) == expected
+
+
+def test_section_navigation_is_shared():
+    first = section_navigation('pokemon/1', 'locations', PokemonEntry.layout)
+    second = section_navigation('pokemon/1', 'locations', PokemonEntry.layout)
+    assert first is second
+    assert first == (SectionReference('', 'pokemon/1/'),
+                     (SectionReference('Base stats', 'pokemon/1/base_stats'),
+                      SectionReference('Evolutions', 'pokemon/1/evolutions'),
+                      SectionReference('Flavour text', 'pokemon/1/flavour_text'),
+                      SectionReference('Learnset', 'pokemon/1/learnset')),
+                     ())
+
+
+def test_encode_section(gloom_entry):
+    section = gloom_entry.section('evolutions')
+    assert decode_section(encode_section(section)) == section
+
+
+def test_shared_cache_keys_include_render_version():
+    assert section_cache.shared_key('key').startswith(f'rotom:{data_version}.{RENDER_VERSION}:section:')
+
+
+@pytest.mark.parametrize(('query', 'expected'), [
+    ('random', True),
+    ('random:pokemon', True),
+    ('move:random', True),
+    ('pokemon,move: random', True),
+    ('pikachu', False),
+    ('randomly', False),
+])
+def test_is_random_query(query, expected):
+    assert is_random_query(query) == expected
+
+
+def test_random_lookups_are_not_cached():
+    assert lookup_entries('random')
+    assert 'random' not in lookup_cache
+    lookup_entries('pikachu')
+    assert 'pikachu' in lookup_cache
+
+
+def test_truncate_message_keeps_whole_lines():
+    line = '*Level up:* ' + 'Tackle, ' * 12
+    assert truncate_message(line) == line
+    truncated = truncate_message('\n'.join([line] * 50))
+    assert len(truncated) <= MAX_MESSAGE_LENGTH
+    assert truncated.endswith(f'{line}\n…')
+    assert set(truncated.split('\n')[:-1]) == {line}
@@ -0,0 +1,45 @@
+import pytest
+
+from pokedex.db import tables
+
+import learnsets
+
+pytestmark = pytest.mark.usefixtures('snapshot_database')
+
+
+def test_learnset_matches_pokemon_moves(session):
+    index = learnsets.index()
+    pm = tables.PokemonMove
+    expected = sorted(set(session.query(pm.pokemon_move_method_id, pm.move_id, pm.level)
+                          .filter(pm.pokemon_id == 1, pm.version_group_id == 1)))
+    actual = sorted((method_id, move_id, level)
+                    for method_id, moves in index.learnset(1, 1)
+                    for move_id, level in moves)
+    assert actual == expected
+
+
+def test_missing_learnset():
+    assert learnsets.index().learnset(1, -1) is None
+
+
+def test_version_groups_for():
+    version_groups = learnsets.index().version_groups_for(1)
+    assert version_groups[0] == 1
+    assert learnsets.index().version_groups_for(-1) == []
+
+
+def test_move_ids_are_delta_encoded():
+    index = learnsets.index()
+    method_id, start, end = index.runs[1, 1][0]
+    assert sum(index.moves[start:end]) == max(move_id for move_id, _ in index.learnset(1, 1)[0][1])
+
+
+def test_learners_match_pokemon_moves(session):
+    index = learnsets.index()
+    pm = tables.PokemonMove
+    protect = 182
+    for method_id, pokemon_ids in index.learners_of(protect):
+        expected = sorted(id_ for id_, in session.query(pm.pokemon_id)
+                          .filter(pm.move_id == protect, pm.pokemon_move_method_id == method_id)
+                          .distinct())
+        assert pokemon_ids == expected
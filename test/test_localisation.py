@@ -0,0 +1,88 @@
+import pytest
+
+from pokedex.db import tables, util
+
+import localisation
+import stat_index
+from app import DEFAULT_LANGUAGE_ID, session
+from entries import AbilityEntry, ItemEntry, MoveEntry, PokemonEntry, section_cache
+from localisation import Localisation
+from textstore import TextStore
+
+pytestmark = pytest.mark.usefixtures('snapshot_database')
+
+FRENCH = 5
+
+
+def test_name_falls_back():
+    english = Localisation(DEFAULT_LANGUAGE_ID, 'en')
+    english.names['pokemon'] = {1: 'Bulbasaur', 2: 'Ivysaur'}
+    english.flavour_texts[1] = (((1, 2), 0),)
+    english.texts = TextStore(['A strange seed was planted on its back at birth.'])
+    french = Localisation(FRENCH, 'fr', english)
+    french.names['pokemon'] = {1: 'Bulbizarre'}
+    assert french.name('pokemon', 1) == 'Bulbizarre'
+    assert french.name('pokemon', 2) == 'Ivysaur'
+    assert french.flavour_text(1) == (((1, 2), 'A strange seed was planted on its back at birth.'),)
+    assert french.memory_usage() < english.memory_usage()
+
+
+def test_language_id():
+    localisation.load()
+    assert localisation.language_id('en') == DEFAULT_LANGUAGE_ID
+    assert localisation.language_id('en-GB') == DEFAULT_LANGUAGE_ID
+    assert localisation.language_id(None) == DEFAULT_LANGUAGE_ID
+    # languages that are not served are answered in the default language
+    assert localisation.language_id('xx') == DEFAULT_LANGUAGE_ID
+
+
+def test_language_id_does_not_load(monkeypatch):
+    monkeypatch.setattr(localisation, '_localisations', {})
+    assert localisation.language_id(None) == DEFAULT_LANGUAGE_ID
+    with pytest.raises(RuntimeError):
+        localisation.language_id('en')
+    with pytest.raises(RuntimeError):
+        localisation.is_multilingual()
+
+
+def test_flavour_texts_group_versions():
+    texts = localisation.get(DEFAULT_LANGUAGE_ID).flavour_text(1)
+    assert texts[0][0] == (1, 2, 15)
+    assert texts[0][1].startswith('A strange seed was planted on its back at birth.')
+
+
+@pytest.fixture
+def french(monkeypatch):
+    english = localisation.get(DEFAULT_LANGUAGE_ID)
+    monkeypatch.setitem(localisation._localisations, FRENCH, Localisation.build(session, FRENCH, 'fr', english))
+    section_cache.clear()
+    yield FRENCH
+    section_cache.clear()
+
+
+def test_sections_are_cached_per_language(french):
+    entry = PokemonEntry(util.get(session, tables.Pokemon, 'bulbasaur'))
+    assert entry.section('').content.startswith('*Bulbasaur (#001)*')
+    entry.language_id = FRENCH
+    assert entry.title() == 'Bulbizarre (#001)'
+    assert entry.section('').content.startswith('*Bulbizarre (#001)*')
+    assert entry.section('flavour_text').content.startswith('*Bulbizarre (#001)*\nFlavour text\n\n*Rouge, Bleu')
+
+
+def test_item_ability_and_move_names_are_translated(french):
+    for model, identifier, cls in ((tables.Item, 'soul-dew', ItemEntry), (tables.Ability, 'pixilate', AbilityEntry),
+                                   (tables.Move, 'protect', MoveEntry)):
+        entry = cls(util.get(session, model, identifier))
+        english_title = entry.title()
+        entry.language_id = french
+        assert entry.title() != english_title
+        assert entry.section('').content.startswith(f'*{entry.title().rpartition(" (")[0]}*')
+    protect = MoveEntry(util.get(session, tables.Move, 'protect'))
+    protect.language_id = french
+    assert protect.title() == 'Abri (move)'
+    assert protect.section('learners').content.startswith('*Abri* (move)\nLearned by')
+
+
+def test_filter_results_are_translated(french):
+    assert 'Bulbizarre (#001)' in stat_index.results_section('hp=45 type:grass', 0, french).content
+    assert 'Bulbasaur (#001)' in stat_index.results_section('hp=45 type:grass', 0).content
@@ -0,0 +1,49 @@
+import pytest
+
+import matchups
+from type_efficacy import chart
+
+pytestmark = pytest.mark.usefixtures('snapshot_database')
+
+
+@pytest.mark.parametrize(('query', 'expected'), [
+    ('pikachu vs gyarados', matchups.MatchupQuery('pikachu', 'gyarados')),
+    ('mr. mime vs. jynx', matchups.MatchupQuery('mr. mime', 'jynx')),
+    ('coverage: fire, water, grass', matchups.CoverageQuery(('fire', 'water', 'grass'))),
+    ('coverage ice/ground', matchups.CoverageQuery(('ice', 'ground'))),
+    ('coverage: ,', None),
+    ('pikachu', None),
+])
+def test_parse(query, expected):
+    assert matchups.parse(query) == expected
+
+
+def test_matchup():
+    expected = '''*Pikachu (#025) vs Gyarados (#130)*
+Pikachu (Electric) → Gyarados: Electric 4x
+Gyarados (Water/Flying) → Pikachu: Water 1x, Flying 0.5x'''
+    assert matchups.matchup('pikachu', 'gyarados') == expected
+
+
+def test_matchup_not_found():
+    assert matchups.matchup('pikachu', 'xyzzy') == 'No Pokémon found for "xyzzy"!'
+
+
+def test_coverage():
+    answer = matchups.coverage(('fire', 'water', 'grass'))
+    total = sum(chart().combo_counts)
+    assert answer.startswith('*Coverage: Fire, Water, Grass*\nSuper effective: ')
+    assert f'/{total} Pokémon' in answer
+    assert 'Walled by: ' in answer
+
+
+def test_coverage_unknown_type():
+    assert matchups.coverage(('fire', 'sound')) == 'Unknown type: sound'
+
+
+def test_best_multipliers_match_type_efficacy(pikachu):
+    c = chart()
+    electric = c.type_positions['electric']
+    ground = c.type_positions['ground']
+    best = c.best_multipliers([electric, ground])
+    assert best[c.pokemon_combos[pikachu.id]] == 2
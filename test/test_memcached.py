@@ -0,0 +1,28 @@
+from memcached import Client
+
+
+def test_get_and_set(memcached_server):
+    client = Client(memcached_server.address)
+    assert client.get('missing') is None
+    assert client.set('key', b'value\r\nwith a line break')
+    assert client.get('key') == b'value\r\nwith a line break'
+    assert client.stats()['hits'] == 1
+    assert client.stats()['misses'] == 1
+
+
+def test_unavailable_server(tmp_path):
+    client = Client(str(tmp_path / 'nothing.sock'), retry_after=60)
+    assert client.get('key') is None
+    assert not client.set('key', b'value')
+    # after the first failure the server is not contacted again until retry_after has passed
+    assert client.errors == 1
+    assert not client.available
+
+
+def test_server_goes_away(memcached_server):
+    client = Client(memcached_server.address, retry_after=0)
+    client.set('key', b'value')
+    memcached_server.process.kill()
+    memcached_server.process.wait()
+    assert client.get('key') is None
+    assert client.errors == 1
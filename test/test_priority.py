@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+
+import pytest
+
+import priority
+from priority import PriorityExecutor, Shed, Ticket, TicketGroup
+
+
+def blocked_executor():
+    executor = PriorityExecutor(max_workers=1, thread_name_prefix='test')
+    release = threading.Event()
+    executor.submit(release.wait)
+    return executor, release
+
+
+def test_runs_most_urgent_first():
+    executor, release = blocked_executor()
+    order = []
+    futures = [executor.submit(order.append, p, ticket=Ticket(p))
+               for p in (priority.INLINE, priority.TEXT, priority.INLINE, priority.INTERACTIVE)]
+    release.set()
+    for f in futures:
+        f.result(timeout=1)
+    assert order == [priority.INTERACTIVE, priority.TEXT, priority.INLINE, priority.INLINE]
+
+
+def test_sheds_superseded_work():
+    executor, release = blocked_executor()
+    ticket = Ticket(priority.INLINE)
+    future = executor.submit(lambda: 'answer', ticket=ticket)
+    ticket.superseded = True
+    release.set()
+    with pytest.raises(Shed):
+        future.result(timeout=1)
+    assert executor.stats()['shed'] == {priority.INLINE: 1}
+
+
+def test_sheds_work_past_its_deadline():
+    executor, release = blocked_executor()
+    future = executor.submit(lambda: 'answer', ticket=Ticket(priority.TEXT, deadline=time.monotonic() + 0.01))
+    time.sleep(0.02)
+    release.set()
+    with pytest.raises(Shed):
+        future.result(timeout=1)
+
+
+def test_exceptions_are_returned():
+    executor = PriorityExecutor(max_workers=1, thread_name_prefix='test')
+    with pytest.raises(ZeroDivisionError):
+        executor.submit(lambda: 1 / 0).result(timeout=1)
+
+
+def test_ticket_group_is_as_urgent_as_its_most_urgent_ticket():
+    group = TicketGroup(Ticket(priority.INLINE))
+    escalations = []
+    group.on_escalate(escalations.append)
+    group.add(Ticket(priority.INLINE))
+    group.add(Ticket(priority.TEXT))
+    group.add(Ticket(priority.INLINE))
+    assert group.priority == priority.TEXT
+    assert escalations == [priority.TEXT]
+
+
+def test_ticket_group_expires_once_every_ticket_has():
+    first, second = Ticket(priority.INLINE), Ticket(priority.INLINE)
+    group = TicketGroup(first)
+    group.add(second)
+    first.superseded = True
+    assert not group.expired()
+    second.superseded = True
+    assert group.expired()
+
+
+def test_ticket_group_without_a_ticket_never_expires():
+    group = TicketGroup(Ticket(priority.INLINE, superseded=True))
+    group.add(None)
+    assert group.priority == priority.INTERACTIVE
+    assert not group.expired()
+
+
+def test_runs_shared_work_while_any_waiter_is_left():
+    executor, release = blocked_executor()
+    first, second = Ticket(priority.INLINE), Ticket(priority.INLINE)
+    group = TicketGroup(first)
+    group.add(second)
+    future = executor.submit(lambda: 'answer', ticket=group)
+    first.superseded = True
+    release.set()
+    assert future.result(timeout=1) == 'answer'
+
+
+def test_escalated_work_runs_at_its_new_priority():
+    executor, release = blocked_executor()
+    order = []
+    group = TicketGroup(Ticket(priority.INLINE))
+    shared = executor.submit(order.append, 'shared', ticket=group)
+    text = executor.submit(order.append, 'text', ticket=Ticket(priority.TEXT))
+    group.add(Ticket(priority.INTERACTIVE))
+    release.set()
+    shared.result(timeout=1)
+    text.result(timeout=1)
+    assert order == ['shared', 'text']
+
+
+def test_escalated_work_runs_once_without_logging(caplog):
+    executor, release = blocked_executor()
+    ran = []
+    group = TicketGroup(Ticket(priority.INLINE))
+    future = executor.submit(ran.append, 'shared', ticket=group)
+    group.add(Ticket(priority.TEXT))
+    release.set()
+    future.result(timeout=1)
+    # queued after the entry left behind at INLINE priority, so runs once that entry has been skipped
+    executor.submit(lambda: None, ticket=Ticket(priority.INLINE)).result(timeout=1)
+    # escalating work that has already run queues nothing
+    group.add(Ticket(priority.INTERACTIVE))
+    assert executor.stats()['queued'] == 0
+    assert ran == ['shared']
+    assert not [r for r in caplog.records if r.levelno >= logging.CRITICAL]
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import time
+from unittest import mock
+
+import pytest
+from tornado import testing
+
+import db
+import server
+
+
+def message(text='pikachu'):
+    return {'update_id': 1, 'message': {'message_id': 1, 'chat': {'id': 10}, 'text': text}}
+
+
+def inline_query(user_id, query='pika'):
+    return {'update_id': 1, 'inline_query': {'id': '20', 'from': {'id': user_id}, 'query': query, 'offset': ''}}
+
+
+def callback_query():
+    return {'update_id': 1, 'callback_query': {'id': '30', 'from': {'id': 1}, 'data': 'pokemon/25/'}}
+
+
+@pytest.mark.parametrize(('update', 'expected'), [
+    (message(), 'message'),
+    (inline_query(1), 'inline_query'),
+    (callback_query(), 'callback_query'),
+    ({'update_id': 1, 'message': {'message_id': 1, 'chat': {'id': 10}, 'sticker': {}}}, None),
+    ({'update_id': 1, 'edited_message': {'message_id': 1, 'chat': {'id': 10}, 'text': 'pikachu'}}, None),
+])
+def test_classify(update, expected):
+    assert server.classify(update) == expected
+
+
+def test_admit_gives_each_kind_its_priority_and_deadline():
+    scheduler = server.Scheduler()
+    for kind, update in (('message', message()), ('inline_query', inline_query(1)),
+                         ('callback_query', callback_query())):
+        ticket = scheduler.admit(kind, update)
+        assert ticket.priority == server.PRIORITIES[kind]
+        assert ticket.deadline == pytest.approx(time.monotonic() + server.DEADLINES[kind], abs=1)
+    assert scheduler.received == {'callback_query': 1, 'message': 1, 'inline_query': 1}
+
+
+def test_admit_supersedes_the_users_previous_inline_query():
+    scheduler = server.Scheduler()
+    first = scheduler.admit('inline_query', inline_query(1, 'pi'))
+    other_user = scheduler.admit('inline_query', inline_query(2, 'pi'))
+    second = scheduler.admit('inline_query', inline_query(1, 'pik'))
+    assert first.superseded and first.expired()
+    assert not other_user.superseded
+    assert not second.superseded
+
+
+def test_admit_does_not_supersede_messages():
+    scheduler = server.Scheduler()
+    first = scheduler.admit('message', message())
+    scheduler.admit('message', message())
+    assert not first.superseded
+
+
+def test_done_counts_shed_updates():
+    scheduler = server.Scheduler()
+    first = scheduler.admit('inline_query', inline_query(1))
+    second = scheduler.admit('inline_query', inline_query(1))
+    scheduler.done('inline_query', first, shed=True)
+    scheduler.done('inline_query', second, shed=False)
+    assert scheduler.shed['inline_query'] == 1
+    assert scheduler.superseded == 1
+    assert 'inline_query' in scheduler.stats()['latency']
+
+
+@pytest.mark.parametrize(('kind', 'update', 'expected'), [
+    ('message', message(), {'method': 'sendMessage', 'chat_id': 10, 'text': server.BUSY_MESSAGE}),
+    ('callback_query', callback_query(),
+     {'method': 'answerCallbackQuery', 'callback_query_id': '30', 'text': server.BUSY_MESSAGE}),
+    ('inline_query', inline_query(1), None),
+])
+def test_shed_response(kind, update, expected):
+    assert server.shed_response(kind, update) == expected
+
+
+@pytest.fixture
+def fake_lookup(monkeypatch):
+    """Answers lookups for "<n> hits" with n Pokémon and renders inline results without the database."""
+    lookups = []
+
+    async def lookup(query):
+        lookups.append(query)
+        return [('pokemon', id_) for id_ in range(1, int(query.split()[0]) + 1)]
+
+    async def inline_results(keys, language_id):
+        return [{'id': f'{table}/{id_}'} for table, id_ in keys]
+
+    monkeypatch.setattr(db, 'lookup', lookup)
+    monkeypatch.setattr(db, 'inline_results', inline_results)
+    server.inline_hits.clear()
+    yield lookups
+    server.inline_hits.clear()
+
+
+def result_ids(serialised_results):
+    return [result['id'] for result in json.loads(serialised_results)]
+
+
+def test_inline_results_are_paged(fake_lookup):
+    results, next_offset = asyncio.run(server.inline_results_for_query('25 hits', 10))
+    assert result_ids(results) == [f'pokemon/{id_}' for id_ in range(11, 21)]
+    assert next_offset == '20'
+    results, next_offset = asyncio.run(server.inline_results_for_query('25 hits', 20))
+    assert result_ids(results) == [f'pokemon/{id_}' for id_ in range(21, 26)]
+    assert next_offset == ''
+    # later pages reuse the first page's hits
+    assert fake_lookup == ['25 hits']
+
+
+@pytest.mark.parametrize(('hits', 'next_offset'), [(10, ''), (11, '10')])
+def test_inline_next_offset_boundary(fake_lookup, hits, next_offset):
+    results, actual = asyncio.run(server.inline_results_for_query(f'{hits} hits', 0))
+    assert len(result_ids(results)) == 10
+    assert actual == next_offset
+
+
+def test_inline_results_past_the_end(fake_lookup):
+    assert asyncio.run(server.inline_results_for_query('5 hits', 10)) == ('', '')
+
+
+def test_random_inline_hits_are_not_kept(fake_lookup, monkeypatch):
+    async def lookup(query):
+        fake_lookup.append(query)
+        return [('pokemon', len(fake_lookup))]
+
+    monkeypatch.setattr(db, 'lookup', lookup)
+    asyncio.run(server.entry_keys_for_query('random'))
+    asyncio.run(server.entry_keys_for_query('random'))
+    assert fake_lookup == ['random', 'random']
+    assert 'random' not in server.inline_hits
+
+
+@pytest.mark.parametrize(('offset', 'expected'), [
+    ('', 0),
+    ('abc', 0),
+    ('-5', 0),
+    ('20', 20),
+])
+def test_parse_offset(offset, expected):
+    assert server.parse_offset(offset) == expected
+
+
+def test_tracker_keeps_cache_time_for_repeated_answers():
+    tracker = server.InlineAnswerTracker(cache_time=60)
+    assert tracker.observe('pika', 0, '[1]') == 60
+    assert tracker.observe('pika', 0, '[1]') == 60
+    assert tracker.observe('pika', 10, '[2]') == 60
+    assert (tracker.queries, tracker.repeated, tracker.changed) == (3, 1, 0)
+
+
+def test_tracker_disables_caching_of_changed_answers():
+    tracker = server.InlineAnswerTracker(cache_time=60)
+    tracker.observe('pika', 0, '[1]')
+    assert tracker.observe('pika', 0, '[2]') == 0
+    assert (tracker.repeated, tracker.changed) == (0, 1)
+    # the new answer is what later answers are compared with
+    assert tracker.observe('pika', 0, '[2]') == 60
+
+
+def test_tracker_keys_answers_by_language():
+    tracker = server.InlineAnswerTracker(cache_time=60)
+    tracker.observe('pika', 0, '[1]', language_id=9)
+    assert tracker.observe('pika', 0, '[2]', language_id=5) == 60
+    assert tracker.changed == 0
+
+
+@pytest.fixture
+def inline_tracker(fake_lookup, monkeypatch):
+    tracker = server.InlineAnswerTracker(cache_time=60)
+    monkeypatch.setattr(server, 'inline_tracker', tracker)
+    monkeypatch.setattr(server, 'language_of', lambda update: server.DEFAULT_LANGUAGE_ID)
+    return tracker
+
+
+@pytest.mark.parametrize('multilingual', [False, True])
+def test_inline_answer_sends_cache_time_and_is_personal(inline_tracker, monkeypatch, multilingual):
+    monkeypatch.setattr(server.localisation, 'is_multilingual', lambda: multilingual)
+    query = inline_query(1, '11 hits')['inline_query']
+    first = asyncio.run(server.handle_inline_query(query))
+    second = asyncio.run(server.handle_inline_query(query))
+    assert first['cache_time'] == second['cache_time'] == 60
+    assert first['is_personal'] is multilingual
+    assert first['next_offset'] == '10'
+    assert inline_tracker.repeated == 1
+
+
+class TestWebhookHandler(testing.AsyncHTTPTestCase):
+    def get_app(self):
+        return server.make_app('token')
+
+    def setUp(self):
+        super().setUp()
+        self.scheduler = server.Scheduler()
+        for patch in (mock.patch.object(server, 'scheduler', self.scheduler),
+                      # nothing here needs the database
+                      mock.patch.object(server.localisation, 'loaded', return_value=True),
+                      mock.patch.object(server.localisation, 'is_multilingual', return_value=False)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def post_update(self, update):
+        response = self.fetch('/webhook', method='POST', body=json.dumps(update))
+        assert response.code == 200
+        return json.loads(response.body) if response.body else None
+
+    def test_shed_message_is_answered_busy(self):
+        # the message's deadline has passed before the database gets to it
+        with mock.patch.dict(server.DEADLINES, {'message': -1}):
+            response = self.post_update(message())
+        assert response == {'method': 'sendMessage', 'chat_id': 10, 'text': server.BUSY_MESSAGE}
+        assert self.scheduler.received['message'] == 1
+        assert self.scheduler.shed['message'] == 1
+        assert 'message' not in self.scheduler.stats()['latency']
+
+    def test_answered_update_is_timed(self):
+        response = self.post_update(inline_query(1, ''))
+        assert response['method'] == 'answerInlineQuery'
+        assert self.scheduler.shed['inline_query'] == 0
+        assert 'inline_query' in self.scheduler.stats()['latency']
+
+    def test_unknown_update_is_ignored(self):
+        assert self.post_update({'update_id': 1, 'edited_message': {}}) is None
+        assert sum(self.scheduler.received.values()) == 0
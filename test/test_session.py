@@ -0,0 +1,57 @@
+import gc
+
+import pytest
+
+from pokedex.db import tables
+
+import entries
+from app import SessionManager, rss_bytes, session
+
+pytestmark = pytest.mark.usefixtures('snapshot_database')
+
+
+def render_everything(manager, pokemon_ids):
+    peak = 0
+    for id_ in pokemon_ids:
+        with manager.scope():
+            entries.section_cache.clear()
+            entry = entries.get_entry('pokemon', id_)
+            for path in entry.sections:
+                entry.section(path)
+        peak = max(peak, manager.identity_map_size)
+    return peak
+
+
+def test_scope_expunges_loaded_objects():
+    manager = SessionManager(session, requests_per_session=10)
+    with manager.scope():
+        entries.get_entry('pokemon', 1).section('')
+        assert len(session.identity_map) > 0
+    assert len(session.identity_map) == 0
+    assert manager.identity_map_size > 0
+
+
+def test_session_is_recycled():
+    manager = SessionManager(session, requests_per_session=2)
+    for _ in range(4):
+        with manager.scope():
+            pass
+    assert manager.recycles == 2
+
+
+def test_soak_memory_stays_flat():
+    manager = SessionManager(session, requests_per_session=25)
+    pokemon_ids = [id_ for id_, in session.query(tables.Pokemon.id).order_by(tables.Pokemon.id).limit(60)]
+
+    # the first pass also builds the indexes and caches that live for the whole process
+    peak_during_warmup = render_everything(manager, pokemon_ids)
+    gc.collect()
+    rss_after_warmup = rss_bytes()
+    peaks_during_soak = []
+    for _ in range(3):
+        peaks_during_soak.append(render_everything(manager, pokemon_ids))
+        assert len(session.identity_map) == 0
+    gc.collect()
+    # rendering the same entries again must hold no more objects than the first time, and retain no memory
+    assert max(peaks_during_soak) <= peak_during_warmup
+    assert rss_bytes() - rss_after_warmup < 4 * 1024 * 1024
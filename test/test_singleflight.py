@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import priority
+from singleflight import Group
+
+
+def test_concurrent_calls_are_coalesced():
+    group = Group()
+    executions = 0
+
+    async def compute(x):
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return x * 2
+
+    async def main():
+        return await asyncio.gather(*(group.do('key', compute, 21) for _ in range(5)))
+
+    assert asyncio.run(main()) == [42] * 5
+    assert executions == 1
+    assert group.stats() == {'calls': 5, 'executions': 1, 'shared': 4, 'in_flight': 0}
+
+
+def test_sequential_calls_are_not_coalesced():
+    group = Group()
+
+    async def compute():
+        return object()
+
+    async def main():
+        return await group.do('key', compute), await group.do('key', compute)
+
+    first, second = asyncio.run(main())
+    assert first is not second
+    assert group.stats()['executions'] == 2
+
+
+def test_different_keys_are_not_coalesced():
+    group = Group()
+
+    async def main():
+        return await asyncio.gather(group.do('a', str.upper, 'a'), group.do('b', str.upper, 'b'))
+
+    assert asyncio.run(main()) == ['A', 'B']
+    assert group.stats()['shared'] == 0
+
+
+def test_sync_functions_run_in_executor():
+    group = Group()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='test')
+    release = threading.Event()
+
+    def compute():
+        release.wait()
+        return threading.current_thread().name
+
+    async def main():
+        calls = [asyncio.ensure_future(group.do('key', compute, executor=executor)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*calls)
+
+    names = asyncio.run(main())
+    executor.shutdown()
+    assert len(set(names)) == 1
+    assert names[0].startswith('test')
+    assert group.stats()['executions'] == 1
+
+
+def test_exceptions_are_shared():
+    group = Group()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError
+
+    async def main():
+        return await asyncio.gather(group.do('key', fail), group.do('key', fail), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert group.stats()['in_flight'] == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    group = Group()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        return 'done'
+
+    async def main():
+        first = asyncio.ensure_future(group.do('key', compute))
+        second = asyncio.ensure_future(group.do('key', compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == 'done'
+
+
+def test_shared_call_runs_for_every_caller():
+    group = Group()
+    first, second = priority.Ticket(priority.INLINE), priority.Ticket(priority.INTERACTIVE)
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        return priority.current_ticket.get()
+
+    async def call(ticket):
+        priority.current_ticket.set(ticket)
+        shared = await group.do('key', compute)
+        assert priority.current_ticket.get() is ticket
+        return shared
+
+    async def main():
+        return await asyncio.gather(call(first), call(second))
+
+    shared, _ = asyncio.run(main())
+    assert shared.tickets == [first, second]
+    assert shared.priority == priority.INTERACTIVE
+    first.superseded = True
+    assert not shared.expired()
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from pokedex.db import tables, util
+
+from sqlalchemy.engine.url import make_url
+
+import snapshot
+from app import DB_URI, session
+
+pytestmark = pytest.mark.usefixtures('snapshot_database')
+
+
+def learns_moves(identifier):
+    pokemon = util.get(session, tables.Pokemon, identifier)
+    return session.query(tables.PokemonMove).filter(tables.PokemonMove.pokemon_id == pokemon.id).count() > 0
+
+
+def test_session_uses_snapshot():
+    assert str(session.bind.url) == 'sqlite://'
+
+
+def test_snapshot_keeps_fixture_evolution_chains():
+    for identifier in ('bulbasaur', 'venusaur', 'pichu', 'vileplume', 'wurmple', 'scyther', 'deoxys-normal'):
+        assert learns_moves(identifier)
+
+
+def test_snapshot_trims_other_pokemon():
+    assert not learns_moves('turtwig')
+    assert session.query(tables.PokemonSpecies).filter_by(identifier='turtwig').count() == 1
+
+
+def test_snapshot_is_built_once():
+    keeper = snapshot._keeper
+    assert keeper is not None
+    snapshot.engine().dispose()
+    assert snapshot._keeper is keeper
+
+
+def test_snapshot_is_smaller_than_the_database():
+    (free_pages,), = snapshot._keeper.execute('PRAGMA freelist_count')
+    (page_count,), = snapshot._keeper.execute('PRAGMA page_count')
+    (page_size,), = snapshot._keeper.execute('PRAGMA page_size')
+    assert free_pages == 0
+    assert page_count * page_size < os.path.getsize(make_url(DB_URI).database)
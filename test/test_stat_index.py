@@ -0,0 +1,70 @@
+from array import array
+
+import pytest
+
+import stat_index
+from stat_index import Column, Comparison, Filter
+
+pytestmark = pytest.mark.usefixtures('snapshot_database')
+
+
+@pytest.mark.parametrize(('query', 'expected'), [
+    ('speed>120 type:dragon', Filter((Comparison('speed', '>', 120),), types=('dragon',), sort='speed')),
+    ('atk >= 100 def<80', Filter((Comparison('attack', '>=', 100), Comparison('defense', '<', 80)), sort='attack')),
+    ('ability:swift-swim sort:-spe', Filter(abilities=('swiftswim',), sort='speed', descending=False)),
+    ('weight>100.5', Filter((Comparison('weight', '>', 1005),), sort='weight')),
+    ('pikachu', None),
+    ('speed>fast', None),
+    ('speed>inf', None),
+    ('hp>1e999', None),
+    ('hp>nan', None),
+    ('sort:speed', None),
+    ('colour:red', None),
+])
+def test_parse(query, expected):
+    assert stat_index.parse(query) == expected
+
+
+@pytest.mark.parametrize(('op', 'value', 'expected'), [
+    ('>', 50, {1, 3}),
+    ('>=', 50, {0, 1, 3}),
+    ('<', 50, {2}),
+    ('<=', 50, {0, 2}),
+    ('=', 50, {0}),
+    ('!=', 50, {1, 2, 3}),
+    ('>', 200, set()),
+])
+def test_column_mask(op, value, expected):
+    column = Column(array('H', [50, 90, 10, 60]))
+    mask = column.mask(op, value)
+    assert {p for p in range(4) if mask >> p & 1} == expected
+
+
+def test_search_matches_stats_and_types():
+    index = stat_index.stat_index()
+    results = index.search(stat_index.parse('speed>100 type:dragon'))
+    assert results
+    speeds = [int(index.value('speed', id_)) for id_ in results]
+    assert all(speed > 100 for speed in speeds)
+    assert speeds == sorted(speeds, reverse=True)
+    assert all(index.types['dragon'] >> index.positions[id_] & 1 for id_ in results)
+
+
+def test_search_by_ability():
+    index = stat_index.stat_index()
+    assert 92 in index.search(stat_index.parse('ability:levitate'))
+
+
+def test_results_section_pages():
+    first = stat_index.results_section('total>500', 0)
+    assert first.parent is None
+    assert first.children[0].path.startswith('pokemon/')
+    assert first.children[-1] == ('Next', 'filter/10/total>500')
+    second = stat_index.results_section('total>500', 10)
+    assert second.parent.path == 'filter/0/total>500'
+    assert stat_index.results_section('speed>255', 0) is None
+
+
+def test_results_section_escapes_query():
+    section = stat_index.results_section('ability:swift_swim', 0)
+    assert section.content.startswith('*Filter:* ability:swift\\_swim\n')
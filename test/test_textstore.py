@@ -0,0 +1,26 @@
+import pytest
+
+from textstore import TextStore
+
+TEXTS = [f'Text number {i} with a phrase every text shares.' for i in range(100)]
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_texts_round_trip(compress):
+    store = TextStore(TEXTS, block_size=8, compress=compress)
+    assert len(store) == len(TEXTS)
+    assert [store[i] for i in range(len(TEXTS))] == TEXTS
+
+
+def test_compression_saves_memory():
+    compressed = TextStore(TEXTS, block_size=32, compress=True)
+    uncompressed = TextStore(TEXTS, block_size=32, compress=False)
+    assert compressed.memory_usage() < uncompressed.memory_usage() / 2
+
+
+def test_missing_text():
+    store = TextStore(TEXTS)
+    with pytest.raises(IndexError):
+        store[len(TEXTS)]
+    with pytest.raises(IndexError):
+        store[-1]
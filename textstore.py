@@ -0,0 +1,52 @@
+import sys
+import zlib
+from typing import Sequence
+
+from cache import LRUCache
+
+# texts are joined with a character that never appears in Pokédex text before being compressed
+SEPARATOR = '\0'
+
+
+class TextStore:
+    """An immutable sequence of strings, optionally zlib-compressed in blocks of `block_size` strings.
+
+    Compressing many short texts together finds the phrases they share, so the store is a fraction of the size of
+    the strings themselves. Blocks are decompressed when one of their texts is first read and the most recently
+    read blocks are kept decompressed.
+    """
+
+    def __init__(self, texts: Sequence[str], block_size: int = 32, compress: bool = True, cached_blocks: int = 16):
+        self.block_size = block_size
+        self.compressed = compress
+        self._length = len(texts)
+        self._blocks = []
+        for start in range(0, len(texts), block_size):
+            block = texts[start:start + block_size]
+            if compress:
+                self._blocks.append(zlib.compress(SEPARATOR.join(block).encode(), 9))
+            else:
+                self._blocks.append(tuple(block))
+        self._decompressed = LRUCache(maxsize=cached_blocks)
+
+    def __getitem__(self, text_id: int) -> str:
+        if not 0 <= text_id < self._length:
+            raise IndexError(text_id)
+        block_id, offset = divmod(text_id, self.block_size)
+        if not self.compressed:
+            return self._blocks[block_id][offset]
+        block = self._decompressed.get(block_id)
+        if block is None:
+            block = tuple(zlib.decompress(self._blocks[block_id]).decode().split(SEPARATOR))
+            self._decompressed.set(block_id, block)
+        return block[offset]
+
+    def __len__(self):
+        return self._length
+
+    def memory_usage(self) -> int:
+        """Approximates the bytes held by the store, not counting decompressed blocks."""
+        size = sys.getsizeof(self._blocks)
+        for block in self._blocks:
+            size += sys.getsizeof(block) + (0 if self.compressed else sum(sys.getsizeof(t) for t in block))
+        return size
@@ -1,11 +1,93 @@
+import threading
+from array import array
+from itertools import groupby
+from math import prod
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
 from pokedex.db import tables
 
+from app import session
+
 
-def get_type_effectiveness(session, pokemon):
+def get_type_effectiveness(session, pokemon, type_names: Optional[Dict[int, str]] = None):
+    """Returns the multiplier of every attacking type against a Pokémon, by type name, translated by `type_names`."""
     type_efficacies = session.query(tables.TypeEfficacy, tables.Type). \
         join(tables.Type, tables.TypeEfficacy.damage_type_id == tables.Type.id). \
         filter(tables.TypeEfficacy.target_type_id.in_(t.id for t in pokemon.types))
     type_effectiveness = {}
     for te, t in type_efficacies:
-        type_effectiveness[t.name] = type_effectiveness.get(t.name, 1) * te.damage_factor / 100
+        name = type_names.get(t.id, t.name) if type_names else t.name
+        type_effectiveness[name] = type_effectiveness.get(name, 1) * te.damage_factor / 100
     return type_effectiveness
+
+
+class TypeChart:
+    """The full type chart, with the multiplier of every attacking type against every distinct type combination.
+
+    Pokémon share a handful of type combinations, so questions about every Pokémon are answered with element-wise
+    operations over the combination columns, weighted by how many Pokémon have each combination.
+    """
+
+    def __init__(self):
+        self.type_ids: List[int] = []
+        self.type_names: List[str] = []
+        # lowercase type name -> index into type_ids
+        self.type_positions: Dict[str, int] = {}
+        # defending type combinations, as tuples of indexes into type_ids
+        self.combos: List[Tuple[int, ...]] = []
+        # number of Pokémon with each combination
+        self.combo_counts = array('H')
+        # multipliers[attacking type][combination]
+        self.multipliers: List[array] = []
+        self.pokemon_combos: Dict[int, int] = {}
+
+    @classmethod
+    def build(cls, session) -> 'TypeChart':
+        chart = cls()
+        te = tables.TypeEfficacy
+        factors = session.query(te.damage_type_id, te.target_type_id, te.damage_factor).all()
+        chart.type_ids = sorted({damage_type_id for damage_type_id, _, _ in factors})
+        type_names = {t.id: t.name for t in session.query(tables.Type).filter(tables.Type.id.in_(chart.type_ids))}
+        chart.type_names = [type_names[id_] for id_ in chart.type_ids]
+        chart.type_positions = {name.lower(): i for i, name in enumerate(chart.type_names)}
+        position = {id_: i for i, id_ in enumerate(chart.type_ids)}
+        efficacy = [[1.0] * len(chart.type_ids) for _ in chart.type_ids]
+        for damage_type_id, target_type_id, damage_factor in factors:
+            efficacy[position[damage_type_id]][position[target_type_id]] = damage_factor / 100
+
+        pt = tables.PokemonType
+        rows = session.query(pt.pokemon_id, pt.type_id).order_by(pt.pokemon_id, pt.slot)
+        combo_positions = {}
+        counts = []
+        for pokemon_id, types in groupby(rows, key=itemgetter(0)):
+            combo = tuple(position[type_id] for _, type_id in types if type_id in position)
+            if combo not in combo_positions:
+                combo_positions[combo] = len(chart.combos)
+                chart.combos.append(combo)
+                counts.append(0)
+            chart.pokemon_combos[pokemon_id] = combo_positions[combo]
+            counts[combo_positions[combo]] += 1
+        chart.combo_counts = array('H', counts)
+        chart.multipliers = [array('f', (prod(row[t] for t in combo) for combo in chart.combos)) for row in efficacy]
+        return chart
+
+    def combo_name(self, combo: int) -> str:
+        return '/'.join(self.type_names[t] for t in self.combos[combo])
+
+    def best_multipliers(self, attacking_types: Iterable[int]) -> List[float]:
+        """Returns the best multiplier among the attacking types against each type combination."""
+        return list(map(max, *(self.multipliers[t] for t in attacking_types), [0.0] * len(self.combos)))
+
+
+_chart: Optional[TypeChart] = None
+_lock = threading.Lock()
+
+
+def chart() -> TypeChart:
+    global _chart
+    if _chart is None:
+        with _lock:
+            if _chart is None:
+                _chart = TypeChart.build(session)
+    return _chart